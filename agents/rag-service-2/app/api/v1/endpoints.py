@@ -18,7 +18,7 @@ router = APIRouter(prefix="/v1", tags=["rag"]) # Use v1 prefix for versioning
 
 # --- /ask Endpoint ---
 @router.post("/ask", response_model=Answer) # Specify the response model for docs and validation
-def ask_question(
+async def ask_question(
     question: Question,
     rag_service: RAGService = Depends(get_rag_service)
 ):
@@ -28,7 +28,7 @@ def ask_question(
     """
     print(f"Received question: {question.text}")
     try:
-        rag_result = rag_service.ask(question.text)
+        rag_result = await rag_service.ask(question.text)
         return Answer(text=rag_result.text, sources=rag_result.sources)
     except Exception as e:
         print(f"An error occurred during RAG processing: {e}")
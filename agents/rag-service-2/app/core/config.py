@@ -17,6 +17,8 @@ class Settings(BaseSettings):
      # --- RAG Specific Config ---
     CHUNK_SIZE: int = 500
     CHUNK_OVERLAP: int = 50
+    REDIS_URL: Optional[str] = None # Optional retrieval-cache backend
+    RETRIEVAL_CACHE_TTL: int = 300 # Seconds before cached retrievals expire
     RETRIEVAL_K: int # <<< Ensure this is here
     SEARCH_TYPE: str # <<< Ensure this is here
     COLLECTION_NAME: str # <<< Add this line to read from environment
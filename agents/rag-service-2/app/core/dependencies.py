@@ -3,6 +3,7 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base # Used for model definition if done here
 
 # Import your custom Retriever class
@@ -30,27 +31,68 @@ DATABASE_URL = settings.DATABASE_URL
 # Create a SQLAlchemy engine
 # The engine is typically a singleton for the application
 # pool_pre_ping=True helps reconnect if the database connection is lost
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# insertmanyvalues_page_size / executemany_mode batch ORM inserts (e.g. bulk
+# DocumentChunk writes) into multi-values INSERT statements instead of one
+# round-trip per row, while still supporting RETURNING.
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    insertmanyvalues_page_size=1000,
+    executemany_mode="values_plus_batch",
+)
 
 # Create a SessionLocal class
 # Each instance of SessionLocal will be a database session
 # This is not a singleton; you need a new session for each request/unit of work
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by request-scoped sessions so /v1/ask no longer parks an
+# anyio worker thread on every DB round-trip. Works best behind pgbouncer in
+# transaction mode, hence the fixed pool with no overflow.
+ASYNC_DATABASE_URL = DATABASE_URL.replace("+psycopg2", "").replace(
+    "postgresql://", "postgresql+asyncpg://", 1
+)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=20, max_overflow=0)
+
 # Base class for declarative models (can also be defined in models.py)
 Base = declarative_base()
 
+# --- Retrieval Cache Dependency ---
+
+# Optional Redis client used by PGVectorRetriever as a retrieval-result cache.
+# The service runs fine without it; the retriever simply skips caching.
+redis_cache_instance = None
+if settings.REDIS_URL:
+    try:
+        import redis.asyncio as redis
+
+        # Async client with tight socket timeouts: a slow or unreachable
+        # cache must degrade to a miss, never stall the event loop.
+        redis_cache_instance = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.2,
+        )
+        print(f"Retrieval cache Redis client initialized for {settings.REDIS_URL}")
+    except Exception as e:
+        print(f"WARNING: Failed to initialize retrieval cache Redis client: {e}")
+        redis_cache_instance = None
+
+
+def get_retrieval_cache():
+    """
+    Dependency that provides the optional singleton Redis cache client (or None).
+    """
+    return redis_cache_instance
+
 
-def get_db() -> Generator:
+async def get_db():
     """
-    Dependency that provides a new database session per request.
+    Dependency that provides a new async database session per request.
     The session is closed automatically after the request is finished.
     """
-    db_session = SessionLocal()
-    try:
+    async with AsyncSession(async_engine) as db_session:
         yield db_session
-    finally:
-        db_session.close()
 
 # --- Embedding Model Dependency ---
 
@@ -190,7 +232,12 @@ def get_retriever(
     """
     print("Initializing custom PGVectorRetriever instance...")
     # Create an instance of our custom retriever class, passing the PGVector store
-    retriever = PGVectorRetriever(pgvector_store=pgvector_store_instance)
+    # and the optional Redis retrieval cache.
+    retriever = PGVectorRetriever(
+        pgvector_store=pgvector_store_instance,
+        redis_client=redis_cache_instance,
+        cache_ttl=settings.RETRIEVAL_CACHE_TTL,
+    )
     print("Custom PGVectorRetriever instance initialized.")
     return retriever # Return the custom retriever instance
 
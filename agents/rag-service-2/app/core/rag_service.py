@@ -1,6 +1,9 @@
 # rag-service-2/app/core/rag_service.py
 
+import hashlib
 from typing import List
+
+import structlog
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough, Runnable
@@ -12,6 +15,28 @@ from app.models.rag import RAGResult
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.llms import Ollama
 
+logger = structlog.get_logger()
+
+_prompt_template = """
+You are an AI assistant specialized in answering questions based on the provided context.
+Answer the user's question truthfully and concisely, using ONLY the information from the following documents.
+If the documents do not contain the answer, state that you cannot find the answer in the provided information.
+Do NOT make up information.
+
+Context:
+{context}
+
+Question:
+{question}
+
+Answer:
+"""
+
+# Parse the prompt template and build the output parser once per process;
+# each RAGService instance only composes the (cheap) runnable pipeline.
+_PROMPT = ChatPromptTemplate.from_template(_prompt_template)
+_OUTPUT_PARSER = StrOutputParser()
+
 class RAGService:
     """
     Encapsulates the core Retrieval Augmented Generation (RAG) logic.
@@ -19,44 +44,33 @@ class RAGService:
     from a vector store, and generating a fact-based answer using an LLM.
     """
 
-    _prompt_template = """
-    You are an AI assistant specialized in answering questions based on the provided context.
-    Answer the user's question truthfully and concisely, using ONLY the information from the following documents.
-    If the documents do not contain the answer, state that you cannot find the answer in the provided information.
-    Do NOT make up information.
-
-    Context:
-    {context}
-
-    Question:
-    {question}
-
-    Answer:
-    """
-
     def __init__(self, retriever: PGVectorRetriever, llm_client: Ollama | ChatGoogleGenerativeAI):
         if not retriever or not llm_client:
             raise ValueError("Retriever and LLM client must be provided.")
         self.retriever = retriever
-        
-        prompt = ChatPromptTemplate.from_template(self._prompt_template)
-        
+
         # Define the LangChain Runnable chain
         self.rag_chain: Runnable = (
             {"context": RunnablePassthrough(), "question": RunnablePassthrough()}
-            | prompt
+            | _PROMPT
             | llm_client
-            | StrOutputParser()
+            | _OUTPUT_PARSER
         )
 
-    def ask(self, question: str, k: int = 5) -> RAGResult:
-        retrieved_docs: List[Document] = self.retriever.retrieve(query=question, k=k)
+    async def ask(self, question: str, k: int = 5) -> RAGResult:
+        retrieved_docs: List[Document] = await self.retriever.retrieve(query=question, k=k)
 
         if not retrieved_docs:
+            # Short-circuit before any prompt assembly or LLM round-trip;
+            # log the question hash so corpus miss rate can be tracked.
+            logger.info(
+                "rag_empty_retrieval",
+                question_hash=hashlib.blake2b(question.encode(), digest_size=16).hexdigest(),
+            )
             return RAGResult(text="I could not find relevant information in the documents to answer your question.", sources=[])
 
         context_text = "\n\n---\n\n".join([doc.page_content for doc in retrieved_docs])
-        answer_text = self.rag_chain.invoke({"context": context_text, "question": question})
+        answer_text = await self.rag_chain.ainvoke({"context": context_text, "question": question})
         unique_sources = list(dict.fromkeys([doc.metadata.get('source', 'N/A') for doc in retrieved_docs]))
 
         return RAGResult(text=answer_text, sources=unique_sources)
\ No newline at end of file
@@ -1,26 +1,50 @@
 # rag-service/app/core/retriever.py
 
+import hashlib
+
+import orjson
 from langchain_community.vectorstores.pgvector import PGVector
 from langchain_core.documents import Document # To type hint returned documents
-from typing import List
+from typing import List, Optional
 
 class PGVectorRetriever:
     """
     Encapsulates logic for performing vector searches against a PGVector store.
+
+    When a Redis client is supplied, retrieval results are cached by
+    (query hash, k, search_type) so repeated FAQ-style questions skip the
+    HNSW traversal entirely. Cache entries expire after cache_ttl seconds,
+    and a global "retriever:version" counter is mixed into every key so a
+    re-index (INCR retriever:version) invalidates the whole cache at once.
     """
-    def __init__(self, pgvector_store: PGVector):
+    def __init__(self, pgvector_store: PGVector, redis_client=None, cache_ttl: int = 300):
         """
         Initializes the retriever with a configured PGVector store instance.
 
         Args:
             pgvector_store: An initialized instance of Langchain's PGVector.
+            redis_client: Optional redis.asyncio client used as a result cache.
+            cache_ttl: Seconds before a cached retrieval expires.
         """
         if not isinstance(pgvector_store, PGVector):
              raise TypeError("pgvector_store must be an instance of langchain_community.vectorstores.pgvector.PGVector")
         self._vector_store = pgvector_store
+        self._redis = redis_client
+        self._cache_ttl = cache_ttl
         print("PGVectorRetriever initialized.")
 
-    def retrieve(self, query: str, k: int = 4, search_type: str = "similarity") -> List[Document]:
+    async def _cache_key(self, query: str, k: int, search_type: str) -> str:
+        version = b"0"
+        try:
+            version = await self._redis.get("retriever:version") or b"0"
+        except Exception as e:
+            print(f"Error reading retriever cache version: {e}")
+        query_hash = hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
+        if isinstance(version, bytes):
+            version = version.decode()
+        return f"ret:{version}:{query_hash}:{k}:{search_type}"
+
+    async def retrieve(self, query: str, k: int = 4, search_type: str = "similarity") -> List[Document]:
         """
         Performs a vector search against the PGVector store to find relevant documents.
 
@@ -36,18 +60,44 @@ class PGVectorRetriever:
             Exception: If an error occurs during the retrieval process.
         """
         print(f"Performing '{search_type}' search for query: '{query[:50]}...' with k={k}")
+
+        cache_key = None
+        if self._redis is not None:
+            cache_key = await self._cache_key(query, k, search_type)
+            try:
+                cached = await self._redis.get(cache_key)
+                if cached is not None:
+                    print(f"Retrieval cache hit for key {cache_key}.")
+                    return [
+                        Document(page_content=content, metadata=metadata)
+                        for content, metadata in orjson.loads(cached)
+                    ]
+            except Exception as e:
+                # Cache problems must never break retrieval; fall through to the store.
+                print(f"Error reading retrieval cache: {e}")
+
         try:
             # Use the underlying Langchain PGVector instance to perform the search
             if search_type == "similarity":
-                # Langchain's similarity_search handles embedding the query internally
-                retrieved_docs = self._vector_store.similarity_search(query, k=k)
+                # Langchain's asimilarity_search handles embedding the query internally
+                retrieved_docs = await self._vector_store.asimilarity_search(query, k=k)
             elif search_type == "mmr":
-                # Langchain's max_marginal_relevance_search handles MMR
-                retrieved_docs = self._vector_store.max_marginal_relevance_search(query, k=k)
+                # Langchain's amax_marginal_relevance_search handles MMR
+                retrieved_docs = await self._vector_store.amax_marginal_relevance_search(query, k=k)
             else:
                 raise ValueError(f"Unsupported search type: {search_type}")
 
             print(f"Retrieved {len(retrieved_docs)} documents.")
+
+            if self._redis is not None and cache_key is not None:
+                try:
+                    payload = orjson.dumps(
+                        [(doc.page_content, doc.metadata) for doc in retrieved_docs]
+                    )
+                    await self._redis.setex(cache_key, self._cache_ttl, payload)
+                except Exception as e:
+                    print(f"Error writing retrieval cache: {e}")
+
             return retrieved_docs
 
         except Exception as e:
@@ -1,15 +1,21 @@
 from typing import Dict, Any, Optional
 import structlog
+from pydantic import TypeAdapter
 from app.models.kafka_messages import TaskRequest, TaskResponse, GeneralInfoPayload
 from app.models.rag import Question
 from app.core.retriever import PGVectorRetriever
-from app.core.dependencies import get_embedding_model, get_llm_client
+from app.core.dependencies import get_embedding_model, get_llm_client, get_retrieval_cache
 from app.core.rag_service import RAGService
 from langchain_community.vectorstores.pgvector import PGVector
 from app.core.config import settings
 
 logger = structlog.get_logger()
 
+# Module-level adapters cache the pydantic-core validator schema once,
+# skipping the class-level hook resolution model_validate pays per call.
+_TASK_REQUEST_ADAPTER = TypeAdapter(TaskRequest)
+_GENERAL_INFO_PAYLOAD_ADAPTER = TypeAdapter(GeneralInfoPayload)
+
 class KafkaMessageHandler:
     """Handler for processing Kafka messages for RAG service"""
     def __init__(self, kafka_client):
@@ -41,7 +47,11 @@ class KafkaMessageHandler:
                 embedding_function=embeddings,
                 collection_name=settings.COLLECTION_NAME,
             )
-            retriever = PGVectorRetriever(pgvector_store=pgvector_store_instance)
+            retriever = PGVectorRetriever(
+                pgvector_store=pgvector_store_instance,
+                redis_client=get_retrieval_cache(),
+                cache_ttl=settings.RETRIEVAL_CACHE_TTL,
+            )
             # Create and store a single RAGService instance for the handler's lifetime.
             self.rag_service = RAGService(retriever=retriever, llm_client=llm_client)
             logger.info("kafka_handler_dependencies_initialized")
@@ -53,7 +63,7 @@ class KafkaMessageHandler:
         """Handle incoming Kafka message"""
         logger.info("kafka_message_received", message=message)
         try:
-            task_request = TaskRequest(**message)
+            task_request = _TASK_REQUEST_ADAPTER.validate_python(message)
             logger.info("processing_kafka_task_request", correlation_id=task_request.correlation_id, task_type=task_request.task_type)
             
             if task_request.task_type == "general_info":
@@ -80,14 +90,14 @@ class KafkaMessageHandler:
     async def _handle_general_info_request(self, task_request: TaskRequest):
         """Handle general info request using the centralized RAGService."""
         try:
-            payload = GeneralInfoPayload(**task_request.payload)
+            payload = _GENERAL_INFO_PAYLOAD_ADAPTER.validate_python(task_request.payload)
             session_id = payload.session_id
             
             if not self.rag_service:
                 raise RuntimeError("RAGService not initialized for Kafka handler.")
                 
             # Delegate the entire RAG process to the RAGService.
-            rag_result = self.rag_service.ask(question=payload.message)
+            rag_result = await self.rag_service.ask(question=payload.message)
             
             result = {
                 "response": rag_result.text,
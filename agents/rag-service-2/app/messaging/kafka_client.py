@@ -1,6 +1,6 @@
 import asyncio
 from confluent_kafka import Producer, Consumer
-import json
+import orjson
 import uuid
 from typing import Dict, Any, Optional, Callable
 import structlog
@@ -67,7 +67,7 @@ class KafkaClient:
             logger.info(f"Sending Kafka task response: {message}", topic=settings.KAFKA_RESPONSE_TOPIC)
             self.producer.produce(
                 settings.KAFKA_RESPONSE_TOPIC,
-                value=json.dumps(message).encode('utf-8'),
+                value=orjson.dumps(message),
                 key=correlation_id.encode('utf-8')
             )
             self.producer.flush()
@@ -105,7 +105,7 @@ class KafkaClient:
                     logger.error(f"Kafka message error: {msg.error()}", topic=settings.KAFKA_REQUEST_TOPIC)
                     continue
                 try:
-                    value = json.loads(msg.value().decode('utf-8'))
+                    value = orjson.loads(msg.value())
                     logger.info(f"Kafka message received: {value}", topic=settings.KAFKA_REQUEST_TOPIC)
                     if self.message_handler:
                         await self.message_handler(value)
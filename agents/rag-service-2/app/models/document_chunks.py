@@ -1,7 +1,7 @@
 # rag-service/app/models/document_chunks.py
 
 # Import SQLAlchemy components
-from sqlalchemy import Column, Integer, Text, create_engine
+from sqlalchemy import Column, BigInteger, Index, Text, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -27,14 +27,30 @@ class DocumentChunk(Base):
     """SQLAlchemy model representing a document chunk stored in PGVector."""
     __tablename__ = DOCUMENT_CHUNKS_TABLE_NAME
 
-    id = Column(Integer, primary_key=True, index=True)
+    # BigInteger avoids int32 overflow beyond ~2B chunks; PG pads Integer PKs
+    # to 8 bytes on aligned tuples anyway, so this costs nothing.
+    id = Column(BigInteger, primary_key=True, index=True)
     # Store the text content of the chunk
     content = Column(Text, nullable=False)
     # Store the vector embedding. Dimension (e.g., 384) must match your embedding model.
     # Check the dimension of the SentenceTransformer model you are using.
+    # The ANN index over this column (DiskANN/IVFFlat, cosine opclass) is
+    # owned by iac/postgres/db_init_schema.py.
     embedding = Column(Vector(384), nullable=False) # !!! IMPORTANT: Replace 384 with actual dimension !!!
     # Store metadata about the chunk, e.g., source file, page number
-    source = Column(Text, index=True) # Example metadata field
+    source = Column(Text) # Example metadata field
+
+    # A BRIN index on source is orders of magnitude smaller than the previous
+    # btree, which matters for the metadata prefilter pass in hybrid
+    # (source filter + vector similarity) queries.
+    __table_args__ = (
+        Index(
+            "ix_document_chunks_source_brin",
+            "source",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+    )
 
     # You could add other metadata fields here, e.g.:
     # page_number = Column(Integer)
@@ -1,17 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Dict, Any, Optional
 from datetime import datetime
 
 class TaskRequest(BaseModel):
-    """Kafka task request message structure"""
-    message_type: str = "TASK_REQUEST"
-    correlation_id: str
-    task_type: str
-    payload: Dict[str, Any]
-    timestamp: float
-
-    class Config:
-        json_schema_extra = {
+    """Kafka task request message structure. Frozen with extra fields
+    forbidden so pydantic-core uses its fast-path validators on the
+    per-message consume path."""
+    model_config = ConfigDict(
+        extra="forbid",
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "message_type": "TASK_REQUEST",
                 "correlation_id": "123e4567-e89b-12d3-a456-426614174000",
@@ -24,18 +22,21 @@ class TaskRequest(BaseModel):
                 },
                 "timestamp": 1640995200.0
             }
-        }
+        },
+    )
 
-class TaskResponse(BaseModel):
-    """Kafka task response message structure"""
-    message_type: str = "TASK_RESPONSE"
+    message_type: str = "TASK_REQUEST"
     correlation_id: str
-    status: str  # "SUCCESS" or "ERROR"
-    result: Dict[str, Any]
+    task_type: str
+    payload: Dict[str, Any]
     timestamp: float
 
-    class Config:
-        json_schema_extra = {
+class TaskResponse(BaseModel):
+    """Kafka task response message structure"""
+    model_config = ConfigDict(
+        extra="forbid",
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "message_type": "TASK_RESPONSE",
                 "correlation_id": "123e4567-e89b-12d3-a456-426614174000",
@@ -48,17 +49,21 @@ class TaskResponse(BaseModel):
                 },
                 "timestamp": 1640995205.0
             }
-        }
+        },
+    )
+
+    message_type: str = "TASK_RESPONSE"
+    correlation_id: str
+    status: str  # "SUCCESS" or "ERROR"
+    result: Dict[str, Any]
+    timestamp: float
 
 class GeneralInfoPayload(BaseModel):
     """Payload structure for general info requests"""
-    message: str
-    session_id: str
-    user_context: Optional[Dict[str, Any]] = {}
-    conversation_history: Optional[list] = []
-
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="forbid",
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "message": "What are your visiting hours?",
                 "session_id": "session-456",
@@ -67,4 +72,13 @@ class GeneralInfoPayload(BaseModel):
                     {"role": "user", "content": "Hello", "timestamp": "2024-01-01T00:00:00"}
                 ]
             }
-        }
+        },
+    )
+
+    message: str
+    session_id: str
+    user_context: Optional[Dict[str, Any]] = {}
+    conversation_history: Optional[list] = []
+    # The orchestrator duplicates the correlation_id inside the payload;
+    # declared here so extra="forbid" accepts the real wire format.
+    correlation_id: Optional[str] = None
@@ -23,32 +23,34 @@ def test_retriever_init_raises_type_error():
     with pytest.raises(TypeError):
         PGVectorRetriever(pgvector_store="not a pgvector store")
 
-def test_retrieve_similarity_search(mock_pgvector_store):
+@pytest.mark.asyncio
+async def test_retrieve_similarity_search(mock_pgvector_store):
     """Tests the retrieve method with search_type='similarity'."""
     # Arrange
     mock_docs = [Document(page_content="test")]
-    mock_pgvector_store.similarity_search.return_value = mock_docs
+    mock_pgvector_store.asimilarity_search.return_value = mock_docs
     retriever = PGVectorRetriever(pgvector_store=mock_pgvector_store)
-    
+
     # Act
-    result = retriever.retrieve("test query", k=3, search_type="similarity")
-    
+    result = await retriever.retrieve("test query", k=3, search_type="similarity")
+
     # Assert
-    mock_pgvector_store.similarity_search.assert_called_once_with("test query", k=3)
-    mock_pgvector_store.max_marginal_relevance_search.assert_not_called()
+    mock_pgvector_store.asimilarity_search.assert_awaited_once_with("test query", k=3)
+    mock_pgvector_store.amax_marginal_relevance_search.assert_not_called()
     assert result == mock_docs
 
-def test_retrieve_mmr_search(mock_pgvector_store):
+@pytest.mark.asyncio
+async def test_retrieve_mmr_search(mock_pgvector_store):
     """Tests the retrieve method with search_type='mmr'."""
     # Arrange
     mock_docs = [Document(page_content="test mmr")]
-    mock_pgvector_store.max_marginal_relevance_search.return_value = mock_docs
+    mock_pgvector_store.amax_marginal_relevance_search.return_value = mock_docs
     retriever = PGVectorRetriever(pgvector_store=mock_pgvector_store)
-    
+
     # Act
-    result = retriever.retrieve("test query", k=5, search_type="mmr")
-    
+    result = await retriever.retrieve("test query", k=5, search_type="mmr")
+
     # Assert
-    mock_pgvector_store.max_marginal_relevance_search.assert_called_once_with("test query", k=5)
-    mock_pgvector_store.similarity_search.assert_not_called()
+    mock_pgvector_store.amax_marginal_relevance_search.assert_awaited_once_with("test query", k=5)
+    mock_pgvector_store.asimilarity_search.assert_not_called()
     assert result == mock_docs
\ No newline at end of file
@@ -20,10 +20,10 @@ def mock_kafka_client():
 def mock_rag_service():
     """Mocks the RAGService."""
     service = MagicMock()
-    service.ask.return_value = RAGResult(
+    service.ask = AsyncMock(return_value=RAGResult(
         text="Mocked RAG answer",
         sources=["mock_source.txt"]
-    )
+    ))
     return service
 
 @pytest.fixture
@@ -21,6 +21,7 @@ class Settings(BaseSettings):
     service_name: str = "backend-orchestrator"
     service_version: str = "1.0.0"
     session_timeout_minutes: int = 30
+    redis_pool_size: int = 64
     max_conversation_history: int = 50
     rate_limit_per_minute: int = 60
     rate_limit_per_hour: int = 1000
@@ -19,15 +19,31 @@ class AnthropicProvider(LLMProviderInterface):
             
             messages = []
             if request.system_prompt:
+                # The system prompt is stable across turns; cache_control lets
+                # Anthropic reuse its KV cache instead of re-prefilling it.
                 messages.append({
                     "role": "system",
-                    "content": request.system_prompt
+                    "content": [{
+                        "type": "text",
+                        "text": request.system_prompt,
+                        "cache_control": {"type": "ephemeral"}
+                    }]
+                })
+
+            if request.cacheable_segments:
+                content = []
+                for text, cacheable in request.cacheable_segments:
+                    block: Dict[str, Any] = {"type": "text", "text": text}
+                    if cacheable:
+                        block["cache_control"] = {"type": "ephemeral"}
+                    content.append(block)
+                content.append({"type": "text", "text": request.prompt})
+                messages.append({"role": "user", "content": content})
+            else:
+                messages.append({
+                    "role": "user",
+                    "content": request.prompt
                 })
-            
-            messages.append({
-                "role": "user", 
-                "content": request.prompt
-            })
             
             response = await self.client.messages.create(
                 model=self.model_name,
@@ -1,4 +1,5 @@
 import google.generativeai as genai
+import tiktoken
 from typing import Dict, Any, Optional, List
 import structlog
 from .provider_interface import LLMProviderInterface, LLMRequest, LLMResponse
@@ -13,14 +14,24 @@ class GeminiProvider(LLMProviderInterface):
         self.model_name = model_name
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
+        try:
+            self._enc = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning("Failed to load tiktoken encoding, falling back to word counts", error=str(e))
+            self._enc = None
         
     async def generate_response(self, request: LLMRequest) -> LLMResponse:
         try:
             logger.info("Generating Gemini response", model=self.model_name)
             
             full_prompt = request.prompt
+            if request.cacheable_segments:
+                # Gemini has no cache_control equivalent here; segments are
+                # simply concatenated ahead of the per-turn prompt.
+                prefix = "".join(text for text, _ in request.cacheable_segments)
+                full_prompt = f"{prefix}{request.prompt}"
             if request.system_prompt:
-                full_prompt = f"System: {request.system_prompt}\n\nUser: {request.prompt}"
+                full_prompt = f"System: {request.system_prompt}\n\nUser: {full_prompt}"
             
             generation_config = genai.types.GenerationConfig(
                 max_output_tokens=request.max_tokens,
@@ -32,10 +43,16 @@ class GeminiProvider(LLMProviderInterface):
                 generation_config=generation_config
             )
             
+            if self._enc is not None:
+                prompt_tokens = len(self._enc.encode(full_prompt))
+                completion_tokens = len(self._enc.encode(response.text))
+            else:
+                prompt_tokens = len(full_prompt.split())  # Rough estimation
+                completion_tokens = len(response.text.split())  # Rough estimation
             usage = {
-                "prompt_tokens": len(full_prompt.split()),  # Rough estimation
-                "completion_tokens": len(response.text.split()),  # Rough estimation
-                "total_tokens": len(full_prompt.split()) + len(response.text.split())
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
             }
             
             return LLMResponse(
@@ -1,54 +1,165 @@
 import yaml
 import os
+import string
+from collections import OrderedDict
 from typing import Dict, Any, Optional
 import structlog
 from pathlib import Path
 
 logger = structlog.get_logger()
 
+_FORMATTER = string.Formatter()
+
+# Bound on memoized (template, variables) -> rendered-string entries.
+_RENDER_CACHE_MAX = 1024
+
 class PromptManager:
     """Manages prompt templates for different agents and use cases"""
-    
+
     def __init__(self, prompts_dir: str = "prompts"):
         self.prompts_dir = Path(__file__).parent.parent / prompts_dir
         self.prompts_cache: Dict[str, str] = {}
         self._load_prompts()
-    
+
     def _load_prompts(self):
         """Load all prompt templates from files"""
+        # Parsed placeholder structure per template, so get_prompt never
+        # re-parses the {var} syntax on the per-request path.
+        self._compiled: Dict[str, Any] = {}
+        # LRU of fully rendered prompts; repeated renders with the same
+        # variables (common within a session) become a dict lookup.
+        self._render_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        # Integer-id fast path: callers resolve a name once and index a
+        # tuple per call instead of hashing the name string each turn.
+        self._names: Dict[str, int] = {}
+        self._prompts_tuple: tuple = ()
+        self._compiled_tuple: tuple = ()
         try:
             if not self.prompts_dir.exists():
                 logger.warning("Prompts directory not found", path=str(self.prompts_dir))
                 return
-            
-            for prompt_file in self.prompts_dir.glob("*.txt"):
-                prompt_name = prompt_file.stem
-                with open(prompt_file, 'r', encoding='utf-8') as f:
-                    self.prompts_cache[prompt_name] = f.read().strip()
-                    
+
+            # scandir reports the file type from the directory entry itself,
+            # avoiding the extra stat-per-file that glob pays; reading bytes
+            # in one call skips the text-layer buffering on the way in.
+            with os.scandir(self.prompts_dir) as entries:
+                for entry in entries:
+                    if not (entry.is_file() and entry.name.endswith('.txt')):
+                        continue
+                    prompt_name = entry.name[:-4]
+                    with open(entry.path, 'rb') as f:
+                        template = f.read().decode('utf-8').strip()
+                    self.prompts_cache[prompt_name] = template
+                    self._compiled[prompt_name] = self._compile(template)
+
+            ordered = sorted(self.prompts_cache)
+            self._names = {name: i for i, name in enumerate(ordered)}
+            self._prompts_tuple = tuple(self.prompts_cache[name] for name in ordered)
+            self._compiled_tuple = tuple(self._compiled[name] for name in ordered)
+
             logger.info("Loaded prompts", count=len(self.prompts_cache))
-            
+
         except Exception as e:
             logger.error("Error loading prompts", error=str(e))
-    
+
+    @staticmethod
+    def _compile(template: str):
+        """Parse a template's placeholders once at load time.
+
+        Templates without placeholders are stored as the plain string so
+        rendering them is a no-op.
+        """
+        parts = list(_FORMATTER.parse(template))
+        if all(field is None for _, field, _, _ in parts):
+            return template
+        return parts
+
+    @staticmethod
+    def _render(compiled, variables: Dict[str, Any]) -> str:
+        """Render pre-parsed template parts: list lookups plus one join."""
+        if isinstance(compiled, str):
+            return compiled
+        pieces = []
+        for literal, field, spec, conversion in compiled:
+            if literal:
+                pieces.append(literal)
+            if field is not None:
+                value = variables[field]
+                if conversion:
+                    value = _FORMATTER.convert_field(value, conversion)
+                pieces.append(format(value, spec) if spec else str(value))
+        return ''.join(pieces)
+
     def get_prompt(self, prompt_name: str, variables: Optional[Dict[str, Any]] = None) -> str:
         """Get a prompt template with optional variable substitution"""
         try:
             if prompt_name not in self.prompts_cache:
                 logger.error("Prompt template not found in cache", prompt_name=prompt_name)
                 raise FileNotFoundError(f"Prompt template '{prompt_name}' not found in prompts directory.")
-            
+
             prompt = self.prompts_cache[prompt_name]
-            
+
             if variables:
-                prompt = prompt.format(**variables)
-            
+                try:
+                    cache_key = (prompt_name, tuple(sorted(variables.items())))
+                    cached = self._render_cache.get(cache_key)
+                except TypeError:
+                    # Unhashable variable values: render without memoizing.
+                    cache_key = None
+                    cached = None
+                if cached is not None:
+                    self._render_cache.move_to_end(cache_key)
+                    return cached
+
+                compiled = self._compiled.get(prompt_name)
+                if compiled is None:
+                    compiled = self._compiled[prompt_name] = self._compile(prompt)
+                prompt = self._render(compiled, variables)
+
+                if cache_key is not None:
+                    self._render_cache[cache_key] = prompt
+                    if len(self._render_cache) > _RENDER_CACHE_MAX:
+                        self._render_cache.popitem(last=False)
+
             return prompt
-            
+
         except Exception as e:
             logger.error("Error getting prompt", prompt_name=prompt_name, error=str(e))
             raise
     
+    def resolve(self, prompt_name: str) -> int:
+        """Resolve a prompt name to its integer id (raises KeyError if absent).
+
+        Intended to be called once at caller startup; pair with get_by_id
+        on the per-request path.
+        """
+        return self._names[prompt_name]
+
+    def get_by_id(self, prompt_id: int, variables: Optional[Dict[str, Any]] = None) -> str:
+        """Fast-path prompt lookup by the id returned from resolve()."""
+        template = self._prompts_tuple[prompt_id]
+        if not variables:
+            return template
+
+        try:
+            cache_key = (prompt_id, tuple(sorted(variables.items())))
+            cached = self._render_cache.get(cache_key)
+        except TypeError:
+            cache_key = None
+            cached = None
+        if cached is not None:
+            self._render_cache.move_to_end(cache_key)
+            return cached
+
+        rendered = self._render(self._compiled_tuple[prompt_id], variables)
+
+        if cache_key is not None:
+            self._render_cache[cache_key] = rendered
+            if len(self._render_cache) > _RENDER_CACHE_MAX:
+                self._render_cache.popitem(last=False)
+
+        return rendered
+
     def list_prompts(self) -> list:
         """List all available prompt names"""
         return list(self.prompts_cache.keys())
@@ -1,14 +1,21 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Dict, Any, Optional, List
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple
 
 @dataclass
 class LLMRequest:
-    """Request object for LLM providers"""
+    """Request object for LLM providers
+
+    cacheable_segments holds (text, cacheable) prompt-prefix segments that
+    precede `prompt`. Providers that support server-side prompt caching
+    (e.g. Anthropic's cache_control) reuse the KV cache for segments marked
+    cacheable; providers without support simply concatenate them.
+    """
     prompt: str
     max_tokens: int = 1000
     temperature: float = 0.7
     system_prompt: Optional[str] = None
+    cacheable_segments: List[Tuple[str, bool]] = field(default_factory=list)
 
 @dataclass
 class LLMResponse:
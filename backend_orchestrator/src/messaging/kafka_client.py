@@ -1,7 +1,9 @@
 import asyncio
+import threading
 from confluent_kafka import Producer, Consumer, KafkaException, KafkaError
-import json
+import orjson
 import uuid
+import logging
 from typing import Dict, Any, Optional, Callable
 import structlog
 from datetime import datetime
@@ -11,6 +13,14 @@ import time # Import the time module for numerical timestamps
 
 logger = structlog.get_logger()
 
+# Level check for gating per-message logs without building their kwargs.
+_stdlib_logger = logging.getLogger(__name__)
+
+# Offsets are committed asynchronously once either bound is hit, instead of
+# a blocking commit RTT per message.
+COMMIT_BATCH_MESSAGES = 500
+COMMIT_INTERVAL_SECONDS = 0.5
+
 class KafkaClient:
     """Kafka client for A2A communication protocol"""
     
@@ -19,40 +29,115 @@ class KafkaClient:
         self.producer: Optional[Producer] = None
         self.consumers: Dict[str, Consumer] = {}
         self.message_handlers: Dict[str, Callable] = {}
-        self.consumer_tasks: Dict[str, asyncio.Task] = {} 
+        self.consumer_threads: Dict[str, threading.Thread] = {}
+        self._stop_event = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tx_queue: asyncio.Queue = asyncio.Queue()
+        self._poll_task: Optional[asyncio.Task] = None
+        # Fast-path throughput counters, surfaced through /metrics.
+        self._sent_counter = 0
+        self._recv_counter = 0
 
     async def start(self):
         """Initialize Kafka producer"""
-        loop = asyncio.get_running_loop()
+        self._loop = asyncio.get_running_loop()
         try:
-            self.producer = await loop.run_in_executor(
-                None, 
-                lambda: Producer({'bootstrap.servers': self.bootstrap_servers})
-            )
+            # produce() only enqueues into librdkafka's internal queue, so the
+            # producer itself never needs an executor; linger/batch settings let
+            # librdkafka coalesce many messages into one broker request.
+            self.producer = Producer({
+                'bootstrap.servers': self.bootstrap_servers,
+                'compression.type': 'lz4',
+                'linger.ms': 20,
+                'batch.num.messages': 10000,
+                'queue.buffering.max.kbytes': 131072,
+                'queue.buffering.max.messages': 1000000,
+                'socket.send.buffer.bytes': 1048576,
+                # Correlation-keyed request/response traffic tolerates at-
+                # least-once; acks=1 without idempotence keeps latency low.
+                'acks': '1',
+                'enable.idempotence': False,
+            })
+            self._poll_task = asyncio.create_task(self._producer_loop())
             logger.info("Kafka producer started", servers=self.bootstrap_servers)
         except Exception as e:
             logger.error("Failed to start Kafka producer", error=str(e), exc_info=True)
-            self.producer = None 
-            raise 
-    
+            self.producer = None
+            raise
+
+    # Maximum number of queued sends handed to librdkafka per drain cycle.
+    _TX_BATCH_SIZE = 500
+
+    async def _producer_loop(self):
+        """Drain queued sends in batches and service delivery callbacks.
+
+        Coalescing sends here (instead of producing inline per request) lets
+        librdkafka fill a full linger.ms/batch window under concurrent load,
+        so many chat turns share one broker round trip.
+        """
+        try:
+            while True:
+                try:
+                    # 20ms idle cadence keeps delivery reports serviced even
+                    # when no new sends arrive, so futures resolve promptly.
+                    item = await asyncio.wait_for(self._tx_queue.get(), timeout=0.02)
+                except asyncio.TimeoutError:
+                    if self.producer is not None:
+                        self.producer.poll(0)
+                    continue
+
+                batch = [item]
+                while len(batch) < self._TX_BATCH_SIZE:
+                    try:
+                        batch.append(self._tx_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+
+                for topic, value, key, on_delivery in batch:
+                    try:
+                        self.producer.produce(topic, value=value, key=key, on_delivery=on_delivery)
+                    except Exception as e:
+                        on_delivery(e, None)
+                self.producer.poll(0)
+        except asyncio.CancelledError:
+            pass
+
+    @staticmethod
+    def _log_delivery(err, msg):
+        """on_delivery callback: sends are fire-and-forget, so failures are
+        only logged. Runs on librdkafka's internal thread."""
+        if err:
+            topic = msg.topic() if msg is not None else "?"
+            _stdlib_logger.error("Kafka delivery failed for topic %s: %s", topic, err)
+
     async def stop(self):
         """Stop Kafka producer and consumers"""
         loop = asyncio.get_running_loop()
         try:
-            if self.producer:
+            if self._poll_task:
+                self._poll_task.cancel()
+                try:
+                    await self._poll_task
+                except asyncio.CancelledError:
+                    pass
+                self._poll_task = None
+
+            # Hand any sends still queued to librdkafka before flushing.
+            while self.producer is not None and not self._tx_queue.empty():
+                topic, value, key, on_delivery = self._tx_queue.get_nowait()
+                self.producer.produce(topic, value=value, key=key, on_delivery=on_delivery)
+
+            if self.producer is not None:
                 await loop.run_in_executor(None, self.producer.flush)
-                self.producer = None 
+                self.producer = None
                 logger.info("Kafka producer flushed.")
 
-            for topic, task in self.consumer_tasks.items():
-                if not task.done():
-                    task.cancel()
-                    try:
-                        await task 
-                    except asyncio.CancelledError:
-                        pass
-                logger.info(f"Kafka consumer task for topic {topic} cancelled.")
-            self.consumer_tasks.clear()
+            self._stop_event.set()
+            for topic, thread in self.consumer_threads.items():
+                if thread.is_alive():
+                    await loop.run_in_executor(None, thread.join, 2.0)
+                logger.info(f"Kafka consumer thread for topic {topic} stopped.")
+            self.consumer_threads.clear()
 
             for consumer in self.consumers.values():
                 await loop.run_in_executor(None, consumer.close)
@@ -65,14 +150,22 @@ class KafkaClient:
     
     async def send_task_request(self, agent_topic: str, task_type: str, payload: Dict[str, Any], correlation_id: Optional[str] = None) -> str:
         """Send a task request to an agent"""
-        loop = asyncio.get_running_loop()
         try:
-            if not self.producer:
+            # confluent's Producer defines __len__ (queued message count),
+            # so truthiness reflects queue depth — compare identity instead.
+            if self.producer is None:
                 logger.error(f"Kafka producer is not initialized for topic {agent_topic}")
                 raise RuntimeError("Kafka producer is not initialized.")
 
             if not correlation_id:
-                correlation_id = str(uuid.uuid4())
+                # uuid4().bytes gives a 16-byte key directly — no hex
+                # formatting or re-encoding, and half the key size on the
+                # wire; the str form is kept for payloads and callers.
+                cid = uuid.uuid4()
+                correlation_id = str(cid)
+                key = cid.bytes
+            else:
+                key = correlation_id.encode('utf-8')
             message = {
                 "message_type": "TASK_REQUEST",
                 "correlation_id": correlation_id,
@@ -81,16 +174,16 @@ class KafkaClient:
                 "timestamp": time.time() # <-- FIX: Use numerical timestamp for the agent's Pydantic model
             }
             
-            value = json.dumps(message).encode('utf-8')
-            key = correlation_id.encode('utf-8')
+            value = orjson.dumps(message)
 
-            await loop.run_in_executor(
-                None, 
-                lambda: self.producer.produce(agent_topic, value=value, key=key)
-            )
-            await loop.run_in_executor(None, self.producer.flush, 0.5) 
+            # Fire-and-forget: enqueue for the producer loop and return
+            # immediately. librdkafka batches within its linger window and
+            # delivery failures surface through _log_delivery.
+            self._tx_queue.put_nowait((agent_topic, value, key, self._log_delivery))
 
-            logger.info("Task request sent", topic=agent_topic, correlation_id=correlation_id, task_type=task_type)
+            self._sent_counter += 1
+            if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Task request sent", topic=agent_topic, correlation_id=correlation_id, task_type=task_type)
             return correlation_id
         except Exception as e:
             logger.error("Failed to send task request", topic=agent_topic, error=str(e), exc_info=True)
@@ -98,9 +191,8 @@ class KafkaClient:
     
     async def send_task_response(self, response_topic: str, correlation_id: str, status: str, result: Dict[str, Any]):
         """Send a task response back to orchestrator"""
-        loop = asyncio.get_running_loop()
         try:
-            if not self.producer:
+            if self.producer is None:
                 logger.error(f"Kafka producer is not initialized for topic {response_topic}")
                 raise RuntimeError("Kafka producer is not initialized.")
 
@@ -112,16 +204,14 @@ class KafkaClient:
                 "timestamp": time.time() # <-- FIX: Use numerical timestamp
             }
             
-            value = json.dumps(message).encode('utf-8')
+            value = orjson.dumps(message)
             key = correlation_id.encode('utf-8')
 
-            await loop.run_in_executor(
-                None,
-                lambda: self.producer.produce(response_topic, value=value, key=key)
-            )
-            await loop.run_in_executor(None, self.producer.flush, 0.5)
+            self._tx_queue.put_nowait((response_topic, value, key, self._log_delivery))
 
-            logger.info("Task response sent", topic=response_topic, correlation_id=correlation_id, status=status)
+            self._sent_counter += 1
+            if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Task response sent", topic=response_topic, correlation_id=correlation_id, status=status)
         except Exception as e:
             logger.error("Failed to send task response", topic=response_topic, error=str(e), exc_info=True)
             raise
@@ -132,74 +222,104 @@ class KafkaClient:
             logger.warning(f"Already subscribed to {topic}. Skipping.")
             return
 
-        loop = asyncio.get_running_loop()
         try:
             consumer = Consumer({
                 'bootstrap.servers': self.bootstrap_servers,
                 'group.id': 'orchestrator-group',
                 'auto.offset.reset': 'earliest',
-                'enable.auto.commit': False 
+                'enable.auto.commit': False,
+                # Let the broker accumulate a batch per fetch instead of
+                # answering each poll with a single tiny message.
+                'fetch.min.bytes': 65536,
+                'fetch.wait.max.ms': 100,
+                'max.partition.fetch.bytes': 1048576,
             })
-            
-            loop.run_in_executor(None, consumer.subscribe, [topic])
-            
+
             self.consumers[topic] = consumer
             self.message_handlers[topic] = handler
-            self.consumer_tasks[topic] = asyncio.create_task(self._consume_messages(topic))
+            # Each consumer gets a dedicated thread rather than a
+            # run_in_executor-per-poll task, so polling never competes with
+            # other blocking work for the shared default executor.
+            thread = threading.Thread(
+                target=self._consume_thread,
+                args=(topic,),
+                daemon=True,
+                name=f"kafka-consumer-{topic}",
+            )
+            self.consumer_threads[topic] = thread
+            thread.start()
             logger.info("Subscribed to topic", topic=topic)
         except Exception as e:
             logger.error("Failed to subscribe to topic", topic=topic, error=str(e), exc_info=True)
             raise
-    
-    async def _consume_messages(self, topic: str):
-        """Background task to consume messages from a topic"""
+
+    # Messages pulled from librdkafka per consume() call; amortizes the
+    # thread/event-loop handoff across the whole batch.
+    _CONSUME_BATCH_SIZE = 32
+
+    def _consume_thread(self, topic: str):
+        """Dedicated consumer thread: pulls message batches and hands the
+        decoded values to the event loop in one run_coroutine_threadsafe hop
+        per batch. Blocking on the batch's result provides natural
+        back-pressure before commit."""
         consumer = self.consumers[topic]
         handler = self.message_handlers[topic]
-        loop = asyncio.get_running_loop() 
+        pending_commit = None
+        uncommitted = 0
+        last_commit = time.monotonic()
+
+        async def _dispatch(values):
+            return await asyncio.gather(*(handler(v) for v in values), return_exceptions=True)
 
         try:
-            while True:
-                msg = await loop.run_in_executor(None, consumer.poll, 1.0)
-                
-                if msg is None:
-                    await asyncio.sleep(0.1) 
+            consumer.subscribe([topic])
+            while not self._stop_event.is_set():
+                msgs = consumer.consume(num_messages=self._CONSUME_BATCH_SIZE, timeout=0.5)
+
+                # Committing the newest processed offset covers everything
+                # before it, so one async commit amortizes the whole batch.
+                if pending_commit is not None and (
+                    uncommitted >= COMMIT_BATCH_MESSAGES
+                    or time.monotonic() - last_commit >= COMMIT_INTERVAL_SECONDS
+                ):
+                    consumer.commit(message=pending_commit, asynchronous=True)
+                    pending_commit = None
+                    uncommitted = 0
+                    last_commit = time.monotonic()
+
+                if not msgs:
                     continue
 
-                if msg.error():
-                    if msg.error().code() == KafkaError._PARTITION_EOF:
-                        logger.debug(f"End of partition reached for {msg.topic()} [{msg.partition()}]")
-                    else:
-                        logger.error("Error consuming messages", topic=topic, error=str(msg.error()))
-                    await asyncio.sleep(0.1) 
+                batch = []
+                for msg in msgs:
+                    if msg.error():
+                        if msg.error().code() == KafkaError._PARTITION_EOF:
+                            logger.debug(f"End of partition reached for {msg.topic()} [{msg.partition()}]")
+                        else:
+                            logger.error("Error consuming messages", topic=topic, error=str(msg.error()))
+                        continue
+                    try:
+                        batch.append((msg, orjson.loads(msg.value())))
+                    except Exception as e:
+                        logger.error("Error decoding message", topic=topic, error=str(e), message=msg.value())
+
+                if not batch:
                     continue
 
                 try:
-                    value = json.loads(msg.value().decode('utf-8'))
-                    await handler(value) 
-                    # FIX IS HERE: Explicitly pass 'message=msg' to consumer.commit
-                    await loop.run_in_executor(None, lambda: consumer.commit(message=msg)) 
+                    results = asyncio.run_coroutine_threadsafe(
+                        _dispatch([value for _, value in batch]), self._loop
+                    ).result()
+                    for (msg, _), result in zip(batch, results):
+                        if isinstance(result, BaseException):
+                            logger.error("Error handling message", topic=topic, error=str(result), message=msg.value())
+                    self._recv_counter += len(batch)
+                    pending_commit = batch[-1][0]
+                    uncommitted += len(batch)
                 except Exception as e:
-                    logger.error("Error handling message or committing offset", topic=topic, error=str(e), message=msg.value(), exc_info=True)
-                    # Capture traceback manually
-                    #exc_type, exc_value, exc_traceback = sys.exc_info()
-                    #formatted_traceback = "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
-
-                    # Remove exc_info=True and pass traceback as a regular field
-                    # Also, explicitly pass the Kafka message details, not the Message object itself
-                    # logger.error(
-                    #     "Error handling message or committing offset",
-                    #     topic=topic,
-                    #     error=str(e),
-                    #     raw_kafka_message_value=msg.value().decode('utf-8', errors='ignore'), # Original bytes decoded
-                    #     kafka_message_topic=msg.topic(),
-                    #     kafka_message_partition=msg.partition(),
-                    #     kafka_message_offset=msg.offset(),
-                    #     stack_trace=formatted_traceback, # Pass the formatted traceback
-                    #     # exc_info=True # <-- REMOVE THIS LINE
-                    # )
-        except asyncio.CancelledError:
-            logger.info(f"Consumer task for {topic} cancelled.")
+                    logger.error("Error handling message batch", topic=topic, error=str(e), exc_info=True)
+
+            if pending_commit is not None:
+                consumer.commit(message=pending_commit, asynchronous=False)
         except Exception as e:
-            logger.error(f"Critical error in Kafka consumer for {topic}: {e}", exc_info=True)
-        finally:
-            pass
\ No newline at end of file
+            logger.error(f"Critical error in Kafka consumer for {topic}: {e}", exc_info=True)
\ No newline at end of file
@@ -1,70 +1,194 @@
+import asyncio
+import copy
+from collections import OrderedDict
 import redis.asyncio as redis
-import json
+import msgspec
+import orjson
 import uuid
+from time import perf_counter
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta, timezone
 import structlog
 
 logger = structlog.get_logger()
 
+# One chat turn reads the same session several times (engine, history,
+# logging); within this window those collapse into a single Redis GET.
+# Local writes invalidate eagerly, and this process is the only writer
+# (the service deliberately runs a single worker), so a second of
+# staleness is safe. Bounded LRU so dead sessions cannot accumulate.
+READ_CACHE_TTL_SECONDS = 1.0
+_READ_CACHE_MAX = 1024
+
+# Live session counter maintained with INCR/DECR so get_active_session_count
+# is a single GET instead of a blocking KEYS scan. Sessions that expire via
+# TTL never hit the DECR path, so cleanup_expired_sessions rebuilds the
+# counter from an actual SCAN.
+_ACTIVE_SESSIONS_KEY = "stats:active_sessions"
+
+# History bound enforced server-side by LTRIM; the list behaves like a
+# deque(maxlen=_HISTORY_MAX) without any client-side slicing.
+_HISTORY_MAX = 50
+
+# Tail of the history stitched into get_session results. Every consumer of
+# session_data["conversation_history"] (intent prompts, agent payloads)
+# slices at most the last five entries, so transferring and decoding the
+# full 50-message list per read is wasted bandwidth; full reads go through
+# get_conversation_history.
+_RECENT_HISTORY = 5
+
+# Static part of the greeting every new session starts with; only the
+# timestamp differs per call.
+_GREETING_TEMPLATE = {
+    "role": "assistant",
+    "content": "Hello! I am your healthcare assistant. How can I help you today?",
+    "metadata": {"status": "completed"}
+}
+
+# Sessions are stored as version-prefixed msgpack: smaller than JSON text
+# and much cheaper to encode/decode at 50-message histories. Blobs without
+# the prefix predate this format and fall back to JSON decoding.
+_SESSION_FORMAT_V1 = b"\x01"
+_msgpack_encoder = msgspec.msgpack.Encoder()
+_msgpack_decoder = msgspec.msgpack.Decoder()
+
+
+def _encode_session(session_data: Dict[str, Any]) -> bytes:
+    return _SESSION_FORMAT_V1 + _msgpack_encoder.encode(session_data)
+
+
+def _decode_session(raw: bytes) -> Dict[str, Any]:
+    if raw[:1] == _SESSION_FORMAT_V1:
+        return _msgpack_decoder.decode(raw[1:])
+    return orjson.loads(raw)
+
+
+def _encode_field(value: Any) -> bytes:
+    # Hash fields: plain strings stay as UTF-8; anything nested (or None)
+    # gets the version-prefixed msgpack treatment. ISO timestamps and ids
+    # never start with the prefix byte, so the formats cannot collide.
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return _SESSION_FORMAT_V1 + _msgpack_encoder.encode(value)
+
+
+def _decode_field(raw: bytes) -> Any:
+    if raw[:1] == _SESSION_FORMAT_V1:
+        return _msgpack_decoder.decode(raw[1:])
+    return raw.decode('utf-8')
+
+
+def _history_key(session_id: str) -> str:
+    # Conversation history lives in its own LIST so appends are O(1)
+    # RPUSH/LTRIM operations instead of a full-blob rewrite per message.
+    return f"session:{session_id}:history"
+
+
+def _corr_key(session_id: str, correlation_id: str) -> str:
+    # Maps a pending message's correlation_id to its history list index,
+    # so completion updates land with LSET instead of a linear scan.
+    return f"session:{session_id}:corr:{correlation_id}"
+
 class SessionManager:
     """Manages user conversation sessions using Redis"""
-    
-    def __init__(self, redis_url: str, session_ttl: int = 3600):
+
+    def __init__(self, redis_url: str, session_ttl: int = 3600, pool_size: int = 64):
         self.redis_url = redis_url
         self.session_ttl = session_ttl  # Session TTL in seconds (1 hour default)
+        self.pool_size = pool_size
         self.redis_client = None
-        
+        # String-returning operations (SMEMBERS, SCAN of key names) go
+        # through a decode_responses client so redis-py decodes in bulk
+        # instead of a Python-level .decode() per member.
+        self._str_client = None
+        self._read_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
     async def initialize(self):
         """Initialize Redis connection"""
         try:
-            self.redis_client = redis.from_url(self.redis_url)
-            await self.redis_client.ping()
+            self.redis_client = redis.from_url(
+                self.redis_url,
+                max_connections=self.pool_size,
+                health_check_interval=30,
+                socket_keepalive=True,
+                retry_on_timeout=True,
+            )
+            self._str_client = redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                max_connections=4,
+                health_check_interval=30,
+                socket_keepalive=True,
+                retry_on_timeout=True,
+            )
+            # Concurrent pings check out one pooled connection each, so the
+            # sockets exist before the first burst of traffic instead of
+            # being established on the hot path.
+            await asyncio.gather(*(self.redis_client.ping() for _ in range(self.pool_size)))
             logger.info("Session manager initialized", redis_url=self.redis_url)
         except Exception as e:
             logger.error("Failed to initialize session manager", error=str(e))
             raise
     
-    async def create_session(self, user_id: str, initial_context: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None) -> str:
-        """Create a new conversation session, using the provided session_id if available."""
+    def _cache_store(self, session_id: str, session_data: Dict[str, Any]) -> None:
+        """Insert a private copy into the read cache with LRU eviction.
+
+        The cache keeps its own deepcopy and hands deepcopies back out, so
+        caller mutations can never corrupt a cached entry within its
+        freshness window.
+        """
+        self._read_cache[session_id] = (perf_counter(), copy.deepcopy(session_data))
+        self._read_cache.move_to_end(session_id)
+        if len(self._read_cache) > _READ_CACHE_MAX:
+            self._read_cache.popitem(last=False)
+
+    async def create_session(self, user_id: str, initial_context: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new conversation session, using the provided session_id if available.
+
+        Returns the full session dict so callers don't need a follow-up
+        get_session round trip for state this method just wrote.
+        """
         try:
             if not session_id:
                 session_id = str(uuid.uuid4())
                 logger.debug("No session_id provided, generating new one.", new_session_id=session_id)
             else:
                 logger.debug("Using client-provided session_id.", session_id=session_id)
+            # One timestamp per call: avoids re-formatting and keeps
+            # created_at, last_activity and the greeting entry identical.
+            now_iso = datetime.now(timezone.utc).isoformat()
             session_data = {
                 "session_id": session_id,
                 "user_id": user_id,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "last_activity": datetime.now(timezone.utc).isoformat(),
-                "conversation_history": [
-                    {
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "role": "assistant",
-                        "content": "Hello! I am your healthcare assistant. How can I help you today?",
-                        "metadata": {"status": "completed"}
-                    }
-                ],
+                "created_at": now_iso,
+                "last_activity": now_iso,
                 "context": initial_context or {},
                 "current_intent": None,
                 "workflow_state": "initial",
                 "pending_tasks": []
             }
-            
+            greeting = {**_GREETING_TEMPLATE, "timestamp": now_iso}
+
             session_key = f"session:{session_id}"
-            await self.redis_client.setex(
-                session_key, 
-                self.session_ttl, 
-                json.dumps(session_data)
-            )
-            
             user_sessions_key = f"user_sessions:{user_id}"
-            await self.redis_client.sadd(user_sessions_key, session_id)
-            await self.redis_client.expire(user_sessions_key, self.session_ttl)
-            
+            # One pipelined round trip instead of sequential awaits. The
+            # metadata lives in a HASH so later updates touch only the
+            # fields that actually changed.
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(session_key, mapping={k: _encode_field(v) for k, v in session_data.items()})
+            pipe.expire(session_key, self.session_ttl)
+            pipe.rpush(_history_key(session_id), _encode_session(greeting))
+            pipe.expire(_history_key(session_id), self.session_ttl)
+            pipe.sadd(user_sessions_key, session_id)
+            pipe.expire(user_sessions_key, self.session_ttl)
+            pipe.incr(_ACTIVE_SESSIONS_KEY)
+            await pipe.execute()
+
+            session_data["conversation_history"] = [greeting]
+            self._cache_store(session_id, session_data)
+
             logger.info("Session created", session_id=session_id, user_id=user_id)
-            return session_id
+            return session_data
             
         except Exception as e:
             logger.error("Failed to create session", user_id=user_id, error=str(e))
@@ -73,15 +197,38 @@ class SessionManager:
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve session data"""
         try:
+            cached = self._read_cache.get(session_id)
+            if cached is not None and perf_counter() - cached[0] < READ_CACHE_TTL_SECONDS:
+                self._read_cache.move_to_end(session_id)
+                return copy.deepcopy(cached[1])
+
             session_key = f"session:{session_id}"
-            session_data_bytes = await self.redis_client.get(session_key)
-            
-            if not session_data_bytes:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.hgetall(session_key)
+                pipe.lrange(_history_key(session_id), -_RECENT_HISTORY, -1)
+                fields, history_raw = await pipe.execute()
+                session_data = {k.decode('utf-8'): _decode_field(v) for k, v in fields.items()} if fields else None
+            except redis.ResponseError:
+                # Sessions written before the HASH migration are plain
+                # string blobs; HGETALL on those raises WRONGTYPE.
+                session_data_bytes = await self.redis_client.get(session_key)
+                session_data = _decode_session(session_data_bytes) if session_data_bytes else None
+                history_raw = []
+
+            if not session_data:
+                self._read_cache.pop(session_id, None)
                 return None
-            
-            return json.loads(session_data_bytes)
 
-        except json.JSONDecodeError as e:
+            # Blobs written before the history LIST split carry their own
+            # embedded conversation_history; otherwise stitch it in from
+            # the side list so callers see the same shape as before.
+            if "conversation_history" not in session_data:
+                session_data["conversation_history"] = [_decode_session(m) for m in history_raw]
+            self._cache_store(session_id, session_data)
+            return session_data
+
+        except (orjson.JSONDecodeError, msgspec.DecodeError) as e:
             logger.error("Failed to decode session data from Redis", session_id=session_id, error=str(e))
             # Corrupted data in Redis is a server error.
             raise ValueError(f"Corrupted session data for {session_id}") from e
@@ -93,48 +240,150 @@ class SessionManager:
     async def update_session(self, session_id: str, updates: Dict[str, Any]):
         """Update session data"""
         try:
-            session_data = await self.get_session(session_id)
-            if not session_data:
-                raise ValueError(f"Session {session_id} not found")
-            
-            session_data.update(updates)
-            session_data["last_activity"] = datetime.now(timezone.utc).isoformat()
-            
             session_key = f"session:{session_id}"
-            await self.redis_client.setex(
-                session_key, 
-                self.session_ttl, 
-                json.dumps(session_data)
-            )
-            
+            now_iso = datetime.now(timezone.utc).isoformat()
+            # History lives in its own LIST key; never embed it in the hash.
+            mapping = {k: _encode_field(v) for k, v in updates.items() if k != "conversation_history"}
+            mapping["last_activity"] = _encode_field(now_iso)
+
+            try:
+                # HSET writes only the changed fields; untouched metadata is
+                # neither read nor re-serialized.
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.exists(session_key)
+                pipe.hset(session_key, mapping=mapping)
+                pipe.expire(session_key, self.session_ttl)
+                results = await pipe.execute()
+                if not results[0]:
+                    await self.redis_client.delete(session_key)
+                    raise ValueError(f"Session {session_id} not found")
+            except redis.ResponseError:
+                # Pre-HASH string blob: merge in Python and migrate it.
+                session_data = await self.get_session(session_id)
+                if not session_data:
+                    raise ValueError(f"Session {session_id} not found")
+                merged = {k: v for k, v in session_data.items() if k != "conversation_history"}
+                merged.update(updates)
+                merged.pop("conversation_history", None)
+                merged["last_activity"] = now_iso
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.delete(session_key)
+                pipe.hset(session_key, mapping={k: _encode_field(v) for k, v in merged.items()})
+                pipe.expire(session_key, self.session_ttl)
+                await pipe.execute()
+
+            self._read_cache.pop(session_id, None)
+
             logger.debug("Session updated", session_id=session_id)
             
         except Exception as e:
             logger.error("Failed to update session", session_id=session_id, error=str(e))
             raise
     
-    async def add_message_to_history(self, session_id: str, role: str, content: str, 
+    async def merge_context(self, session_id: str, delta: Dict[str, Any]):
+        """Merge a delta into the session's stored context.
+
+        Only the context hash field is read and rewritten, so callers pass
+        just the keys that changed instead of rebuilding and re-sending the
+        full context dict. An empty delta is a no-op.
+        """
+        if not delta:
+            return
+        try:
+            session_key = f"session:{session_id}"
+            try:
+                raw = await self.redis_client.hget(session_key, "context")
+            except redis.ResponseError:
+                # Pre-HASH string blob; HGET raises WRONGTYPE.
+                raw = None
+
+            if raw is None:
+                # Legacy blob or missing session: the read-modify-write path
+                # through update_session handles both (and migrates blobs).
+                session_data = await self.get_session(session_id)
+                if not session_data:
+                    raise ValueError(f"Session {session_id} not found")
+                await self.update_session(
+                    session_id, {"context": {**session_data.get("context", {}), **delta}}
+                )
+                return
+
+            context = _decode_field(raw)
+            context.update(delta)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(session_key, mapping={
+                "context": _encode_field(context),
+                "last_activity": _encode_field(datetime.now(timezone.utc).isoformat()),
+            })
+            pipe.expire(session_key, self.session_ttl)
+            await pipe.execute()
+            self._read_cache.pop(session_id, None)
+
+            logger.debug("Session context merged", session_id=session_id)
+
+        except Exception as e:
+            logger.error("Failed to merge session context", session_id=session_id, error=str(e))
+            raise
+
+    async def touch(self, session_id: str) -> bool:
+        """Refresh a session's TTL without rewriting any data.
+
+        Heartbeats and keepalives only need the expiry pushed out; EXPIRE
+        on the metadata and history keys is a few bytes on the wire versus
+        re-sending the whole session.
+        """
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.expire(f"session:{session_id}", self.session_ttl)
+            pipe.expire(_history_key(session_id), self.session_ttl)
+            results = await pipe.execute()
+            return bool(results[0])
+
+        except Exception as e:
+            logger.error("Failed to touch session", session_id=session_id, error=str(e))
+            raise
+
+    async def add_message_to_history(self, session_id: str, role: str, content: str,
                                    metadata: Optional[Dict[str, Any]] = None):
         """Add a message to conversation history"""
         try:
-            session_data = await self.get_session(session_id)
-            if not session_data:
-                raise ValueError(f"Session {session_id} not found")
-            
+            now_iso = datetime.now(timezone.utc).isoformat()
             message = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": now_iso,
                 "role": role,  # user, assistant, system
                 "content": content,
                 "metadata": metadata or {}
             }
-            
-            session_data["conversation_history"].append(message)
-            
-            if len(session_data["conversation_history"]) > 50:
-                session_data["conversation_history"] = session_data["conversation_history"][-50:]
-            
-            await self.update_session(session_id, session_data)
-            
+
+            session_key = f"session:{session_id}"
+            history_key = _history_key(session_id)
+            # Constant-cost append: RPUSH + LTRIM on the history LIST, no
+            # decode/re-encode of the session blob. One pipelined round trip.
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.exists(session_key)
+            pipe.rpush(history_key, _encode_session(message))
+            pipe.ltrim(history_key, -_HISTORY_MAX, -1)
+            pipe.expire(history_key, self.session_ttl)
+            pipe.expire(session_key, self.session_ttl)
+            results = await pipe.execute()
+
+            if not results[0]:
+                # The RPUSH above created an orphan list; drop it.
+                await self.redis_client.delete(history_key)
+                raise ValueError(f"Session {session_id} not found")
+
+            correlation_id = (metadata or {}).get("correlation_id")
+            if correlation_id:
+                # Record where this pending message landed. The index can go
+                # stale if later appends trigger trimming, so the update path
+                # verifies it before using it.
+                index = min(results[1], _HISTORY_MAX) - 1
+                await self.redis_client.set(
+                    _corr_key(session_id, correlation_id), index, ex=self.session_ttl
+                )
+
+            self._read_cache.pop(session_id, None)
+
         except Exception as e:
             logger.error("Failed to add message to history", 
                         session_id=session_id, error=str(e))
@@ -143,27 +392,48 @@ class SessionManager:
     async def update_message_by_correlation_id(self, session_id: str, correlation_id: str, new_content: str):
         """Finds a message by its correlation_id in metadata and updates its content."""
         try:
-            session_data = await self.get_session(session_id)
-            if not session_data:
+            history_key = _history_key(session_id)
+
+            # Fast path: the side index points straight at the list entry.
+            indexed = await self.redis_client.get(_corr_key(session_id, correlation_id))
+            if indexed is not None:
+                index = int(indexed)
+                raw = await self.redis_client.lindex(history_key, index)
+                if raw is not None:
+                    message = _decode_session(raw)
+                    # Verify — trimming may have shifted the index.
+                    if message.get("metadata", {}).get("correlation_id") == correlation_id:
+                        message["content"] = new_content
+                        message["timestamp"] = datetime.now(timezone.utc).isoformat()
+                        message["metadata"]["status"] = "completed"
+                        pipe = self.redis_client.pipeline(transaction=False)
+                        pipe.lset(history_key, index, _encode_session(message))
+                        pipe.delete(_corr_key(session_id, correlation_id))
+                        await pipe.execute()
+                        self._read_cache.pop(session_id, None)
+                        return
+
+            history_raw = await self.redis_client.lrange(history_key, 0, -1)
+            if not history_raw:
                 logger.warning("Attempted to update message in a non-existent session.", session_id=session_id)
                 return
 
-            history = session_data.get("conversation_history", [])
             message_found = False
-            for message in history:
+            for index, raw in enumerate(history_raw):
+                message = _decode_session(raw)
                 if message.get("metadata", {}).get("correlation_id") == correlation_id:
                     logger.debug("Found message to update by correlation_id", session_id=session_id, correlation_id=correlation_id)
                     message["content"] = new_content
                     message["timestamp"] = datetime.now(timezone.utc).isoformat()
                     if "metadata" in message:
                         message["metadata"]["status"] = "completed"
+                    # In-place O(1) rewrite of just this list entry.
+                    await self.redis_client.lset(history_key, index, _encode_session(message))
+                    self._read_cache.pop(session_id, None)
                     message_found = True
                     break
-            
-            if message_found:
-                session_data["conversation_history"] = history
-                await self.update_session(session_id, session_data)
-            else:
+
+            if not message_found:
                 logger.warning("Could not find message with matching correlation_id to update.", session_id=session_id, correlation_id=correlation_id)
 
         except Exception as e:
@@ -172,16 +442,23 @@ class SessionManager:
     async def get_conversation_history(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get conversation history for a session"""
         try:
+            start = -limit if limit else 0
+            history_raw = await self.redis_client.lrange(_history_key(session_id), start, -1)
+            if history_raw:
+                return [_decode_session(m) for m in history_raw]
+
+            # Sessions written before the history LIST split keep their
+            # history embedded in the blob.
             session_data = await self.get_session(session_id)
             if not session_data:
                 return []
-            
+
             history = session_data.get("conversation_history", [])
             if limit:
                 history = history[-limit:]
-            
+
             return history
-            
+
         except Exception as e:
             logger.error("Failed to get conversation history", 
                         session_id=session_id, error=str(e))
@@ -191,15 +468,17 @@ class SessionManager:
         """Clear/delete a session"""
         try:
             session_data = await self.get_session(session_id)
+            session_key = f"session:{session_id}"
+            pipe = self.redis_client.pipeline(transaction=False)
             if session_data:
                 user_id = session_data["user_id"]
-                
-                user_sessions_key = f"user_sessions:{user_id}"
-                await self.redis_client.srem(user_sessions_key, session_id)
-            
-            session_key = f"session:{session_id}"
-            await self.redis_client.delete(session_key)
-            
+                pipe.srem(f"user_sessions:{user_id}", session_id)
+                pipe.decr(_ACTIVE_SESSIONS_KEY)
+            pipe.delete(session_key)
+            pipe.delete(_history_key(session_id))
+            await pipe.execute()
+            self._read_cache.pop(session_id, None)
+
             logger.info("Session cleared", session_id=session_id)
             
         except Exception as e:
@@ -210,8 +489,8 @@ class SessionManager:
         """Get all active sessions for a user"""
         try:
             user_sessions_key = f"user_sessions:{user_id}"
-            sessions = await self.redis_client.smembers(user_sessions_key)
-            return [s.decode() for s in sessions] if sessions else []
+            sessions = await self._str_client.smembers(user_sessions_key)
+            return list(sessions) if sessions else []
             
         except Exception as e:
             logger.error("Failed to get user sessions", user_id=user_id, error=str(e))
@@ -220,10 +499,9 @@ class SessionManager:
     async def get_active_session_count(self) -> int:
         """Get total number of active sessions"""
         try:
-            pattern = "session:*"
-            keys = await self.redis_client.keys(pattern)
-            return len(keys)
-            
+            count = await self.redis_client.get(_ACTIVE_SESSIONS_KEY)
+            return max(int(count), 0) if count is not None else 0
+
         except Exception as e:
             logger.error("Failed to get active session count", error=str(e))
             return 0
@@ -231,24 +509,33 @@ class SessionManager:
     async def cleanup_expired_sessions(self):
         """Clean up expired sessions (called periodically)"""
         try:
-            pattern = "user_sessions:*"
-            user_session_keys = await self.redis_client.keys(pattern)
-            
-            for key in user_session_keys:
-                session_ids = await self.redis_client.smembers(key)
-                valid_sessions = []
-                
+            # scan_iter walks the keyspace incrementally instead of a blocking
+            # KEYS call; liveness checks for each set are pipelined into one
+            # round trip, and only the stale members are SREM'd.
+            async for key in self._str_client.scan_iter(match="user_sessions:*", count=500):
+                session_ids = await self._str_client.smembers(key)
+                if not session_ids:
+                    continue
+
+                session_ids = list(session_ids)
+                pipe = self._str_client.pipeline(transaction=False)
                 for session_id in session_ids:
-                    session_key = f"session:{session_id.decode()}"
-                    if await self.redis_client.exists(session_key):
-                        valid_sessions.append(session_id)
-                
-                if valid_sessions:
-                    await self.redis_client.delete(key)
-                    await self.redis_client.sadd(key, *valid_sessions)
-                else:
-                    await self.redis_client.delete(key)
-            
+                    pipe.exists(f"session:{session_id}")
+                exists_flags = await pipe.execute()
+
+                stale = [sid for sid, alive in zip(session_ids, exists_flags) if not alive]
+                if stale:
+                    await self._str_client.srem(key, *stale)
+
+            # TTL-expired sessions never pass through clear_session, so the
+            # INCR/DECR counter drifts; resynchronize it from a SCAN here.
+            active = 0
+            async for key in self._str_client.scan_iter(match="session:*", count=500):
+                # Skip side keys like session:{id}:history.
+                if key.count(":") == 1:
+                    active += 1
+            await self.redis_client.set(_ACTIVE_SESSIONS_KEY, active)
+
             logger.info("Session cleanup completed")
             
         except Exception as e:
@@ -1,43 +1,74 @@
 import asyncio
-import json
-from typing import Dict, Any, Optional
+import orjson
+from typing import Any, Callable, Dict, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 import structlog
 
 logger = structlog.get_logger()
 
+# Connections are sharded so broadcast can schedule one task per shard,
+# each iterating a short dict, instead of walking one big registry.
+_SHARD_COUNT = 8
+
 class WebSocketManager:
     """Manages WebSocket connections for real-time communication with frontend clients"""
-    
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-    
+        self._shards: list = [{} for _ in range(_SHARD_COUNT)]
+        # Optional per-message-type encoders for high-rate, fixed-shape
+        # frames (typing indicators, acks): a registered callable can build
+        # the bytes with a string concat instead of a full orjson traversal.
+        self._fast_encoders: Dict[str, Callable[[Dict[str, Any]], bytes]] = {}
+
+    def register_fast_encoder(self, message_type: str, encoder: Callable[[Dict[str, Any]], bytes]):
+        """Register a specialized serializer for one message type."""
+        self._fast_encoders[message_type] = encoder
+
+    def _encode(self, message: Dict[str, Any]) -> bytes:
+        encoder = self._fast_encoders.get(message.get("type"))
+        if encoder is not None:
+            return encoder(message)
+        return orjson.dumps(message)
+
+    def _shard(self, session_id: str) -> Dict[str, WebSocket]:
+        return self._shards[hash(session_id) % _SHARD_COUNT]
+
     async def connect(self, session_id: str, websocket: WebSocket):
         """Accept a WebSocket connection and store it by session_id"""
         try:
             await websocket.accept()
-            self.active_connections[session_id] = websocket
+            self._shard(session_id)[session_id] = websocket
             logger.info("WebSocket connection established", session_id=session_id)
         except Exception as e:
             logger.error("Failed to establish WebSocket connection", session_id=session_id, error=str(e))
             raise
-    
+
     def disconnect(self, session_id: str):
         """Remove a WebSocket connection"""
-        if session_id in self.active_connections:
-            del self.active_connections[session_id]
+        shard = self._shard(session_id)
+        if session_id in shard:
+            del shard[session_id]
             logger.info("WebSocket connection closed", session_id=session_id)
-    
-    async def send_message(self, session_id: str, message: Dict[str, Any]) -> bool:
-        """Send a message to a specific session's WebSocket connection"""
-        if session_id not in self.active_connections:
+
+    async def send_message(self, session_id: str, message: Any) -> bool:
+        """Send a message to a specific session's WebSocket connection.
+
+        Accepts either a dict or pre-serialized JSON bytes, so callers that
+        build a payload once can reuse it across sessions.
+        """
+        websocket = self._shard(session_id).get(session_id)
+        if websocket is None:
             logger.warning("No active WebSocket connection for session", session_id=session_id)
             return False
-        
-        websocket = self.active_connections[session_id]
+
         try:
-            await websocket.send_text(json.dumps(message))
-            logger.debug("Message sent via WebSocket", session_id=session_id, message_type=message.get("type"))
+            # Payloads are serialized once as bytes but shipped as text
+            # frames: the frontend client JSON-parses event.data and does
+            # not handle binary frames.
+            payload = message if isinstance(message, bytes) else self._encode(message)
+            await websocket.send_text(payload.decode())
+            logger.debug("Message sent via WebSocket", session_id=session_id,
+                         message_type=message.get("type") if isinstance(message, dict) else None)
             return True
         except WebSocketDisconnect:
             logger.info("WebSocket disconnected while sending message", session_id=session_id)
@@ -47,33 +78,43 @@ class WebSocketManager:
             logger.error("Failed to send WebSocket message", session_id=session_id, error=str(e))
             self.disconnect(session_id)
             return False
-    
+
+    async def _broadcast_shard(self, shard: Dict[str, WebSocket], payload: bytes):
+        """Fan a pre-serialized payload out to one shard concurrently."""
+        targets = list(shard.items())
+        if not targets:
+            return
+        text = payload.decode()
+        results = await asyncio.gather(
+            *(websocket.send_text(text) for _, websocket in targets),
+            return_exceptions=True,
+        )
+        for (session_id, _), result in zip(targets, results):
+            if isinstance(result, WebSocketDisconnect):
+                logger.info("WebSocket disconnected during broadcast", session_id=session_id)
+                self.disconnect(session_id)
+            elif isinstance(result, BaseException):
+                logger.error("Failed to broadcast to WebSocket", session_id=session_id, error=str(result))
+                self.disconnect(session_id)
+
     async def broadcast(self, message: Dict[str, Any]):
         """Broadcast a message to all active WebSocket connections"""
-        if not self.active_connections:
+        if not any(self._shards):
             logger.debug("No active WebSocket connections for broadcast")
             return
-        
-        disconnected_sessions = []
-        for session_id, websocket in self.active_connections.items():
-            try:
-                await websocket.send_text(json.dumps(message))
-            except WebSocketDisconnect:
-                logger.info("WebSocket disconnected during broadcast", session_id=session_id)
-                disconnected_sessions.append(session_id)
-            except Exception as e:
-                logger.error("Failed to broadcast to WebSocket", session_id=session_id, error=str(e))
-                disconnected_sessions.append(session_id)
-        
-        for session_id in disconnected_sessions:
-            self.disconnect(session_id)
-        
-        logger.debug("Broadcast completed", active_connections=len(self.active_connections))
-    
+
+        # Serialize once and fan out concurrently: one encode pass for N
+        # clients, and broadcast latency becomes that of the slowest client
+        # instead of the sum over all clients.
+        payload = self._encode(message)
+        await asyncio.gather(*(self._broadcast_shard(shard, payload) for shard in self._shards))
+
+        logger.debug("Broadcast completed", active_connections=self.get_active_connections_count())
+
     def get_active_connections_count(self) -> int:
         """Get the number of active WebSocket connections"""
-        return len(self.active_connections)
-    
+        return sum(len(shard) for shard in self._shards)
+
     def is_connected(self, session_id: str) -> bool:
         """Check if a session has an active WebSocket connection"""
-        return session_id in self.active_connections
+        return session_id in self._shard(session_id)
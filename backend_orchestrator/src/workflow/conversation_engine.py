@@ -1,9 +1,18 @@
 import asyncio
-import uuid
+import logging
+import re
+import secrets
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone
 import structlog
-import json
+import orjson
+import time
+
+try:
+    import ahocorasick
+except ImportError:  # Optional accelerator; the pattern loop still works without it.
+    ahocorasick = None
 
 from ..llm_abstraction.provider_interface import LLMProviderInterface, LLMRequest 
 from ..llm_abstraction.prompt_manager import PromptManager
@@ -12,6 +21,45 @@ from ..session.session_manager import SessionManager
 
 logger = structlog.get_logger()
 
+# Level check for gating per-turn debug logs without building their kwargs
+# (message slices, previews) when the configured level filters them anyway.
+_stdlib_logger = logging.getLogger(__name__)
+
+# Classified intents per normalized message; chat traffic repeats short
+# utterances ("hi", "help", "book appointment") often enough that this
+# skips the pattern scan and, for LLM-classified messages, the round trip.
+_INTENT_CACHE_MAX = 4096
+
+# Upper bound on in-flight agent requests; beyond this the oldest pending
+# entry is evicted so lost Kafka responses can never leak the table.
+_MAX_PENDING_RESPONSES = 1000
+
+# If the primary LLM has not answered within this window, the fallback is
+# started in parallel and whichever provider finishes first wins (hedged
+# request); primary tail latency becomes min(primary, fallback + delay).
+_HEDGE_DELAY_SECONDS = 0.5
+
+# Envelope timestamps only need second precision; memoize the ISO string
+# so bursts of agent responses share one strftime-equivalent formatting.
+_NOW_CACHE = [0.0, ""]
+
+
+def _iso_now() -> str:
+    now = time.monotonic()
+    if now - _NOW_CACHE[0] >= 1.0 or not _NOW_CACHE[1]:
+        _NOW_CACHE[0] = now
+        _NOW_CACHE[1] = datetime.now(timezone.utc).isoformat()
+    return _NOW_CACHE[1]
+
+
+def _build_final_response_envelope(data: Dict[str, Any]) -> bytes:
+    """Serialize the final_response WebSocket envelope once, as bytes."""
+    return orjson.dumps({
+        "type": "final_response",
+        "data": data,
+        "timestamp": _iso_now()
+    })
+
 class ConversationEngine:
     """Main conversation processing engine that orchestrates AI agents"""
     
@@ -37,6 +85,41 @@ class ConversationEngine:
             "post_discharge": ["discharge", "recovery", "follow-up", "medication"]
         }
 
+        # Emergency keywords checked as a set intersection before any other
+        # classification work: the highest-priority path never waits on the
+        # pattern scan, cache or an LLM round trip.
+        self._emergency_tokens = frozenset(self.intent_patterns["medical_emergency"])
+
+        # Compile the patterns into one Aho-Corasick automaton: a single
+        # O(len(message)) scan replaces ~30 Python-level substring checks per
+        # turn. Priorities preserve the dict-order first-match semantics of
+        # the original loop.
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for priority, (intent, patterns) in enumerate(self.intent_patterns.items()):
+                for pattern in patterns:
+                    automaton.add_word(pattern, (priority, intent))
+            automaton.make_automaton()
+            self._intent_automaton = automaton
+            self._intent_regex = None
+            self._regex_groups = {}
+        else:
+            # Lighter-weight fallback when pyahocorasick is unavailable: one
+            # compiled alternation scanned by the C regex engine instead of a
+            # per-pattern Python substring loop. No \b anchors, to keep the
+            # original substring-match semantics.
+            self._intent_automaton = None
+            self._regex_groups = {
+                f"{intent}__{i}": (priority, intent)
+                for priority, (intent, patterns) in enumerate(self.intent_patterns.items())
+                for i, _ in enumerate(patterns)
+            }
+            self._intent_regex = re.compile("|".join(
+                f"(?P<{intent}__{i}>{re.escape(pattern)})"
+                for intent, patterns in self.intent_patterns.items()
+                for i, pattern in enumerate(patterns)
+            ))
+
         # Define explicit mapping for Kafka agent interactions
         # ADDED 'temporary_response' to each agent's configuration
         self.kafka_agent_topic_map = {
@@ -72,8 +155,30 @@ class ConversationEngine:
             },
         }
         
-        self.pending_agent_responses: Dict[str, Dict[str, Any]] = {}
-        self._setup_kafka_listeners() 
+        # Routing checks resolve against these cached references instead of
+        # re-walking the attribute chain and dict per message.
+        self._kafka_intents = frozenset(self.kafka_agent_topic_map)
+        self._agent_config_lookup = self.kafka_agent_topic_map.get
+
+        # Resolve hot-path prompt names to integer ids once; per-turn lookups
+        # then index a tuple instead of hashing the name string.
+        try:
+            self._intent_prompt_id = prompt_manager.resolve("intent_classification")
+        except KeyError:
+            self._intent_prompt_id = None
+        try:
+            self._general_info_prompt_id = prompt_manager.resolve("general_info_response")
+        except KeyError:
+            self._general_info_prompt_id = None
+
+        self._intent_cache: "OrderedDict[str, str]" = OrderedDict()
+
+        # Running loop, cached on first use from an async method; avoids the
+        # deprecated get_event_loop policy lookup on every routed message.
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.pending_agent_responses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._setup_kafka_listeners()
     
     # --- Kafka Listener Setup ---
     def _setup_kafka_listeners(self):
@@ -109,24 +214,27 @@ class ConversationEngine:
             if session_id:
                 # Logic for handling unsolicited messages can go here
                 if self.websocket_manager:
-                    await self.websocket_manager.send_message(session_id, {
-                        "type": "final_response",
-                        "data": {
-                            "session_id": session_id,
-                            "response": result.get("response", "Agent update."),
-                            "intent": "unsolicited_update",
-                            "requires_human_handoff": result.get("requires_human_handoff", False),
-                            "suggested_actions": result.get("suggested_actions", []),
-                            "correlation_id": None
-                        },
-                        "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
+                    await self.websocket_manager.send_message(session_id, _build_final_response_envelope({
+                        "session_id": session_id,
+                        "response": result.get("response", "Agent update."),
+                        "intent": "unsolicited_update",
+                        "requires_human_handoff": result.get("requires_human_handoff", False),
+                        "suggested_actions": result.get("suggested_actions", []),
+                        "correlation_id": None
+                    }))
             return
 
         pending_request_data = self.pending_agent_responses.pop(correlation_id)
+        timeout_handle = pending_request_data.get("timeout_handle")
+        if timeout_handle:
+            timeout_handle.cancel()
         agent_future = pending_request_data.get("future")
         intent = pending_request_data.get("intent")
 
+        # One session fetch serves both the RAG-failure fallback and the
+        # agent-context merge below.
+        session_data = await self.session_manager.get_session(session_id) if session_id else None
+
         # Check if the RAG agent failed to find an answer.
         is_rag_failure = (
             intent == "general_info" and
@@ -136,7 +244,6 @@ class ConversationEngine:
         if is_rag_failure:
             logger.warning("RAG agent failed. Triggering general LLM fallback.", correlation_id=correlation_id, session_id=session_id)
             original_message = pending_request_data.get("message")
-            session_data = await self.session_manager.get_session(session_id)
 
             if original_message and session_data:
                 final_payload = await self._handle_general_info_fallback(session_id, original_message, session_data)
@@ -155,34 +262,31 @@ class ConversationEngine:
                 "correlation_id": correlation_id
             }
 
-        # Resolve future and send final response via WebSocket
-        if agent_future and not agent_future.done():
+        # Resolve the future only if a caller is actually awaiting one; the
+        # normal WebSocket push flow never allocates it (see await_final).
+        if agent_future is not None and not agent_future.done():
             agent_future.set_result(final_payload)
-            logger.info(f"Final response ready for session: {session_id}", correlation_id=correlation_id)
-            
-            if session_id:
-                # Instead of adding a new message, update the temporary one using the correlation_id
-                await self.session_manager.update_message_by_correlation_id(
-                    session_id, correlation_id, final_payload["response"]
-                )
 
-                # --- NEW: Update session context with agent's state ---
-                if agent_context:
-                    current_session = await self.session_manager.get_session(session_id)
-                    if current_session:
-                        new_context = {**current_session.get("context", {}), **agent_context}
-                        await self.session_manager.update_session(session_id, {"context": new_context})
-                        logger.info("Updated session context with data from agent", session_id=session_id, agent_context=agent_context)
+        logger.info("final_response_ready", session_id=session_id, correlation_id=correlation_id)
 
-                logger.debug(f"Updated assistant message in history for session_id: {session_id}")
-                if self.websocket_manager:
-                    await self.websocket_manager.send_message(session_id, {
-                        "type": "final_response",
-                        "data": final_payload,
-                        "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
-        else:
-            logger.warning(f"Future for correlation_id {correlation_id} already done or missing. Skipping update.", session_id=session_id)
+        if session_id:
+            # Instead of adding a new message, update the temporary one using the correlation_id
+            await self.session_manager.update_message_by_correlation_id(
+                session_id, correlation_id, final_payload["response"]
+            )
+
+            # --- NEW: Update session context with agent's state ---
+            if agent_context and session_data:
+                # Server-side merge: only the delta crosses the wire.
+                await self.session_manager.merge_context(session_id, agent_context)
+                logger.info("Updated session context with data from agent", session_id=session_id, agent_context=agent_context)
+
+            if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                logger.debug("assistant_message_updated", session_id=session_id)
+            if self.websocket_manager:
+                await self.websocket_manager.send_message(
+                    session_id, _build_final_response_envelope(final_payload)
+                )
 
     # --- Generic Kafka Agent Routing Method (Returns temporary message immediately) ---
     async def _route_to_kafka_agent(self, session_id: str, message: str,
@@ -192,7 +296,7 @@ class ConversationEngine:
         message immediately, and the actual Kafka response will be handled
         asynchronously in the background (e.g., via WebSockets/polling).
         """
-        agent_config = self.kafka_agent_topic_map.get(intent)
+        agent_config = self._agent_config_lookup(intent)
         if not agent_config:
             logger.error(f"Attempted to route intent '{intent}' to Kafka agent, but no configuration found in kafka_agent_topic_map.")
             # Fallback to general LLM if mapping is missing
@@ -203,18 +307,32 @@ class ConversationEngine:
         # Timeout is still relevant for the asyncio.Future, but not for the immediate return.
         # timeout_seconds = agent_config.get("timeout", 20) 
 
-        correlation_id = str(uuid.uuid4())
-        # The Future is still created to be resolved by _handle_agent_response later
-        response_future = asyncio.Future() 
+        # token_hex(16) carries the same 128 bits of randomness as uuid4 but
+        # skips UUID object construction and hyphenated formatting.
+        correlation_id = secrets.token_hex(16)
+        loop = self._loop
+        if loop is None:
+            loop = self._loop = asyncio.get_running_loop()
+        timeout_seconds = agent_config.get("timeout", 30)
         self.pending_agent_responses[correlation_id] = {
-            "future": response_future,
+            # Allocated lazily by await_final: the WebSocket push path never
+            # awaits it, so most requests skip the Future entirely.
+            "future": None,
             "session_id": session_id,
             "intent": intent,
             "message": message, # Store the original message for potential fallback
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": loop.time(),
+            # One event-loop timer per request: fires only if the agent never
+            # answers, so there is no periodic scan of the pending table.
+            "timeout_handle": loop.call_later(timeout_seconds, self._fire_timeout, correlation_id)
         }
-        
-        logger.info(f"Sending request to Kafka agent for intent '{intent}'", 
+
+        while len(self.pending_agent_responses) > _MAX_PENDING_RESPONSES:
+            evicted_id, evicted = self.pending_agent_responses.popitem(last=False)
+            self._discard_pending(evicted_id, evicted)
+            logger.warning("Evicted oldest pending agent request", correlation_id=evicted_id)
+
+        logger.info("kafka_agent_request_sent", intent=intent,
                     correlation_id=correlation_id, request_topic=request_topic, session_id=session_id)
 
         try:
@@ -242,8 +360,9 @@ class ConversationEngine:
             }
         except Exception as e:
             logger.error(f"Error sending message to Kafka for intent '{intent}' (correlation_id: {correlation_id}): {str(e)}", exc_info=True, session_id=session_id)
-            if correlation_id in self.pending_agent_responses:
-                del self.pending_agent_responses[correlation_id]
+            failed = self.pending_agent_responses.pop(correlation_id, None)
+            if failed:
+                self._discard_pending(correlation_id, failed)
             return {
                 "response": "I encountered an issue trying to send your request. Please try again or contact support.",
                 "intent": intent,
@@ -252,47 +371,128 @@ class ConversationEngine:
                 "confidence_score": 0.0
             }
     
-    async def _monitor_agent_timeouts(self):
-        """Periodically checks for and handles timed-out agent requests."""
-        while True:
-            await asyncio.sleep(5) # Check every 5 seconds
-            now = asyncio.get_event_loop().time()
-            timed_out_ids = []
-            for correlation_id, request_data in self.pending_agent_responses.items():
-                intent = request_data.get("intent", "unknown")
-                agent_config = self.kafka_agent_topic_map.get(intent, {})
-                timeout_seconds = agent_config.get("timeout", 30)
-                
-                if now - request_data["timestamp"] > timeout_seconds:
-                    timed_out_ids.append(correlation_id)
-
-            for correlation_id in timed_out_ids:
-                request_data = self.pending_agent_responses.pop(correlation_id, None)
-                if request_data and self.websocket_manager:
-                    session_id = request_data["session_id"]
-                    logger.warning("Agent request timed out", correlation_id=correlation_id, session_id=session_id)
-                    # This is where you would send a timeout message to the user via WebSocket
-                    # For now, we just log it and clean up.
+    async def await_final(self, correlation_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait for the final agent payload for an in-flight correlation_id.
+
+        This is the only place a pending entry's Future is created, so the
+        fire-and-forget path (temporary response + WebSocket push) never
+        pays for one.
+        """
+        pending = self.pending_agent_responses.get(correlation_id)
+        if pending is None:
+            raise KeyError(f"No pending agent request for correlation_id {correlation_id}")
+        future = pending.get("future")
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            pending["future"] = future
+        if timeout is not None:
+            return await asyncio.wait_for(future, timeout)
+        return await future
+
+    @staticmethod
+    def _discard_pending(correlation_id: str, request_data: Dict[str, Any]):
+        """Cancel the timer and future of a pending entry being dropped."""
+        handle = request_data.get("timeout_handle")
+        if handle:
+            handle.cancel()
+        future = request_data.get("future")
+        if future and not future.done():
+            future.cancel()
+
+    def _fire_timeout(self, correlation_id: str):
+        """loop.call_later callback: the agent never answered in time."""
+        request_data = self.pending_agent_responses.pop(correlation_id, None)
+        if request_data is None:
+            return  # Completed (and cancelled this timer) just before firing.
+        future = request_data.get("future")
+        if future and not future.done():
+            future.cancel()
+        logger.warning("Agent request timed out", correlation_id=correlation_id,
+                       session_id=request_data["session_id"])
+        # This is where you would send a timeout message to the user via WebSocket
+        # For now, we just log it and clean up.
+
+    async def _call_llm_hedged(self, llm_request: LLMRequest):
+        """Run an LLM request with fallback hedging.
+
+        The primary provider gets _HEDGE_DELAY_SECONDS to itself; if it is
+        still running (or failed outright) the fallback provider is started
+        and the first successful response wins, with the loser cancelled.
+        Raises only when both providers fail.
+        """
+        primary = asyncio.ensure_future(self.llm_provider.generate_response(llm_request))
+        try:
+            return await asyncio.wait_for(asyncio.shield(primary), _HEDGE_DELAY_SECONDS)
+        except asyncio.TimeoutError:
+            logger.info("Primary LLM slow; hedging with fallback provider")
+        except Exception as e:
+            logger.warning(f"Primary LLM call failed: {str(e)}. Attempting fallback LLM.", error=str(e))
+            return await self.fallback_provider.generate_response(llm_request)
+
+        fallback = asyncio.ensure_future(self.fallback_provider.generate_response(llm_request))
+        pending = {primary, fallback}
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in (primary, fallback):
+                if task in done and task.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    return task.result()
+            for task in done:
+                last_error = task.exception()
+        raise last_error
+
+    def _match_intent_patterns(self, message_lower: str) -> Optional[str]:
+        """Match the keyword patterns against an already-lowercased message."""
+        if self._intent_automaton is not None:
+            best = None
+            for _, (priority, intent) in self._intent_automaton.iter(message_lower):
+                if best is None or priority < best[0]:
+                    best = (priority, intent)
+            return best[1] if best else None
+
+        best = None
+        for match in self._intent_regex.finditer(message_lower):
+            priority, intent = self._regex_groups[match.lastgroup]
+            if best is None or priority < best[0]:
+                best = (priority, intent)
+        return best[1] if best else None
+
+    def _cache_intent(self, key: str, intent: str):
+        self._intent_cache[key] = intent
+        self._intent_cache.move_to_end(key)
+        if len(self._intent_cache) > _INTENT_CACHE_MAX:
+            self._intent_cache.popitem(last=False)
 
     # --- Intent Classification ---
     async def _classify_intent(self, message: str, session_data: Dict[str, Any]) -> str:
         """Classify user intent using pattern matching and then LLM if no match."""
         try:
             message_lower = message.lower()
-            for intent, patterns in self.intent_patterns.items():
-                if any(pattern in message_lower for pattern in patterns):
-                    logger.info("Intent classified via patterns", intent=intent, message_preview=message[:50])
-                    return intent
-            
+            cache_key = " ".join(message_lower.split())[:200]
+            cached = self._intent_cache.get(cache_key)
+            if cached is not None:
+                self._intent_cache.move_to_end(cache_key)
+                return cached
+
+            matched = self._match_intent_patterns(message_lower)
+            if matched:
+                self._cache_intent(cache_key, matched)
+                logger.info("Intent classified via patterns", intent=matched, message_preview=message[:50])
+                return matched
+
             logger.info("No pattern match, falling back to LLM for intent classification.", message_preview=message[:50])
-            classification_prompt = self.prompt_manager.get_prompt(
-                "intent_classification", 
-                {
-                    "message": message,
-                    "conversation_history": "\n".join([f"{m['sender']}: {m['content']}" for m in session_data.get("conversation_history", [])[-5:]]),
-                    "current_context": json.dumps(session_data.get("context", {})) 
-                }
-            )
+            history = session_data.get("conversation_history", [])
+            classification_variables = {
+                "message": message,
+                "conversation_history": "\n".join([f"{m['sender']}: {m['content']}" for m in history[-5:]]) if history else "",
+                "current_context": orjson.dumps(session_data.get("context", {})).decode()
+            }
+            if self._intent_prompt_id is not None:
+                classification_prompt = self.prompt_manager.get_by_id(self._intent_prompt_id, classification_variables)
+            else:
+                classification_prompt = self.prompt_manager.get_prompt("intent_classification", classification_variables)
             
             llm_request = LLMRequest(
                 prompt=classification_prompt,
@@ -302,32 +502,21 @@ class ConversationEngine:
             )
             
             try:
-                response = await self.llm_provider.generate_response(llm_request)
+                response = await self._call_llm_hedged(llm_request)
                 intent = response.content.strip().lower()
-                
-                valid_intents = list(self.intent_patterns.keys())
-                if intent in valid_intents:
+
+                if intent in self.intent_patterns:
+                    self._cache_intent(cache_key, intent)
                     logger.info("Intent classified via LLM", intent=intent, message_preview=message[:50])
                     return intent
                 else:
                     logger.warning(f"LLM classified unknown intent: '{intent}'. Defaulting to general_info.", message_preview=message[:50])
-                    return "general_info" 
-                    
+                    return "general_info"
+
             except Exception as e:
-                logger.warning(f"Primary LLM intent classification failed: {str(e)}. Attempting fallback LLM.", message_preview=message[:50], error=str(e))
-                try:
-                    response = await self.fallback_provider.generate_response(llm_request) 
-                    intent = response.content.strip().lower()
-                    if intent in valid_intents:
-                        logger.info("Intent classified via fallback LLM", intent=intent, message_preview=message[:50])
-                        return intent
-                    else:
-                        logger.warning(f"Fallback LLM classified unknown intent: '{intent}'. Defaulting to general_info.", message_preview=message[:50])
-                        return "general_info"
-                except Exception as e_fallback:
-                    logger.error(f"Fallback LLM intent classification also failed: {str(e_fallback)}. Defaulting to general_info.", message_preview=message[:50], error=str(e_fallback))
-                    return "general_info" 
-            
+                logger.error(f"LLM intent classification failed on both providers: {str(e)}. Defaulting to general_info.", message_preview=message[:50], error=str(e))
+                return "general_info"
+
         except Exception as e:
             logger.error("Critical error during intent classification process", error=str(e), exc_info=True, message_preview=message[:50])
             return "general_info"
@@ -361,14 +550,16 @@ I'm flagging this for immediate human review.
         """Fallback to direct LLM when no specific agent is applicable or Kafka agent fails."""
         logger.info("Using direct LLM for general info/fallback", session_id=session_id, message_preview=message[:50])
         try:
-            general_prompt = self.prompt_manager.get_prompt(
-                "general_info_response", 
-                {
-                    "message": message,
-                    "conversation_history": "\n".join([f"{m['sender']}: {m['content']}" for m in session_data.get("conversation_history", [])[-3:]]),
-                    "user_context": json.dumps(session_data.get("context", {})) 
-                }
-            )
+            history = session_data.get("conversation_history", [])
+            general_variables = {
+                "message": message,
+                "conversation_history": "\n".join([f"{m['sender']}: {m['content']}" for m in history[-3:]]) if history else "",
+                "user_context": orjson.dumps(session_data.get("context", {})).decode()
+            }
+            if self._general_info_prompt_id is not None:
+                general_prompt = self.prompt_manager.get_by_id(self._general_info_prompt_id, general_variables)
+            else:
+                general_prompt = self.prompt_manager.get_prompt("general_info_response", general_variables)
             
             llm_request = LLMRequest(
                 prompt=general_prompt,
@@ -377,19 +568,9 @@ I'm flagging this for immediate human review.
                 system_prompt="You are a helpful healthcare assistant. Your attempt to find specific information in the hospital's knowledge base has failed. Now, answer the user's question based on your general knowledge. IMPORTANT: Start your response by stating that you could not find specific information and are providing a general answer. For example: 'I couldn't find specific details in our documents, but generally...'. Do not give medical advice."
             )
             
-            try:
-                response = await self.llm_provider.generate_response(llm_request)
-                content = response.content
-                logger.info("Generated general info response with primary LLM", session_id=session_id)
-            except Exception as e:
-                logger.warning(f"Primary LLM failed for general info/fallback: {str(e)}. Attempting fallback LLM.", session_id=session_id, error=str(e))
-                try:
-                    response = await self.fallback_provider.generate_response(llm_request)
-                    content = response.content
-                    logger.info("Generated general info response with fallback LLM", session_id=session_id)
-                except Exception as e_fallback:
-                    logger.error(f"Fallback LLM also failed for general info/fallback: {str(e_fallback)}", session_id=session_id, error=str(e_fallback))
-                    raise 
+            response = await self._call_llm_hedged(llm_request)
+            content = response.content
+            logger.info("Generated general info response", session_id=session_id)
 
             return {
                 "response": content,
@@ -410,13 +591,13 @@ I'm flagging this for immediate human review.
                              session_data: Dict[str, Any]) -> Dict[str, Any]:
         """Routes the message to the appropriate handler based on intent."""
         
-        if intent in self.kafka_agent_topic_map:
-            logger.info(f"Routing intent '{intent}' to Kafka agent and returning temporary response.", session_id=session_id)
+        if intent in self._kafka_intents:
+            logger.info("routing_to_kafka_agent", intent=intent, session_id=session_id)
             # This call will now return the temporary response immediately
             return await self._route_to_kafka_agent(session_id, message, intent, session_data)
-        
+
         # If no specific Kafka agent is mapped, or for direct LLM intents
-        logger.info(f"No specific Kafka agent configured for intent '{intent}'. Falling back to general LLM.", session_id=session_id)
+        logger.info("routing_to_general_llm", intent=intent, session_id=session_id)
         return await self._handle_general_info_fallback(session_id, message, session_data)
             
     # --- Main Message Processing Entry Point ---
@@ -435,21 +616,32 @@ I'm flagging this for immediate human review.
             if not session_data:
                 # If session doesn't exist or no ID was provided, create one.
                 # Pass the client's session_id if it exists, otherwise a new one will be generated.
-                session_id = await self.session_manager.create_session(
-                    user_id=user_id, 
-                    initial_context=context, 
+                session_data = await self.session_manager.create_session(
+                    user_id=user_id,
+                    initial_context=context,
                     session_id=session_id
                 )
-                session_data = await self.session_manager.get_session(session_id)
+                session_id = session_data["session_id"]
                 logger.info("Session ensured", session_id=session_id, user_id=user_id, client_provided_id=client_provided_session_id)
 
-            await self.session_manager.add_message_to_history(
+            # The user-message write does not feed classification (which works
+            # off the session_data already in hand), so it runs concurrently
+            # with step 2 and is awaited before the assistant append below to
+            # keep history ordered.
+            user_write = asyncio.ensure_future(self.session_manager.add_message_to_history(
                 session_id, "user", message
-            )
-            logger.debug("User message added to history", session_id=session_id, message_preview=message[:50])
-            
-            # 2. Intent Classification
-            intent = await self._classify_intent(message, session_data or {})
+            ))
+
+            # 2. Intent Classification. Emergencies short-circuit straight to
+            # the handler; anything else goes through the normal classifier.
+            if self._emergency_tokens.intersection(message.lower().split()):
+                intent = "medical_emergency"
+            else:
+                intent = await self._classify_intent(message, session_data or {})
+
+            await user_write
+            if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                logger.debug("User message added to history", session_id=session_id, message_preview=message[:50])
             
             # 3. Route to Specific Handlers / Agents
             if intent == "medical_emergency":
@@ -463,18 +655,21 @@ I'm flagging this for immediate human review.
             # The *final* response from Kafka agent will need to be added to history
             # by the _handle_agent_response method when it arrives.
             # We add the correlation_id to the metadata so we can find and update this message later.
-            await self.session_manager.add_message_to_history(
-                session_id, "assistant", response_payload["response"],
-                metadata={"correlation_id": response_payload.get("correlation_id"), "status": "pending"}
+            # 5 runs concurrently with it: the history append and the
+            # intent/context update touch independent keys.
+            await asyncio.gather(
+                self.session_manager.add_message_to_history(
+                    session_id, "assistant", response_payload["response"],
+                    metadata={"correlation_id": response_payload.get("correlation_id"), "status": "pending"}
+                ),
+                self.session_manager.update_session(session_id, {"current_intent": intent}),
+                # Pass only the per-request delta; merge_context no-ops when
+                # there is none, so most turns stop re-sending the full
+                # accumulated context dict.
+                self.session_manager.merge_context(session_id, context or {}),
             )
-            logger.debug("Assistant response added to history", session_id=session_id, message_preview=response_payload["response"][:50])
-            
-            # 5. Update Session Context and Intent
-            await self.session_manager.update_session(session_id, {
-                "current_intent": intent,
-                "context": {**(session_data or {}).get("context", {}), **(context or {})} 
-            })
-            logger.debug("Session updated", session_id=session_id, current_intent=intent)
+            if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Assistant response recorded and session updated", session_id=session_id, current_intent=intent)
 
             # 6. Return the orchestrated response to the API (this will be the temporary one for Kafka)
             return {
@@ -1,65 +1,129 @@
+import copy
 import pytest
 import asyncio
-import json
-from unittest.mock import Mock, AsyncMock, patch
+import threading
+import uuid
+import orjson
+from unittest.mock import Mock, patch, create_autospec
+from confluent_kafka import Producer
 from src.messaging.kafka_client import KafkaClient
 
+# All I/O here is mocked, so the file is safe to pin to its own xdist
+# worker (pytest -n auto --dist loadgroup).
+pytestmark = pytest.mark.xdist_group(name="kafka_client_unit")
+
+# Spec introspection over the Producer API (produce/poll/flush) happens
+# once at import; each test takes a reset copy instead of paying
+# create_autospec per test.
+_PRODUCER_TEMPLATE = create_autospec(Producer, instance=True)
+
+
+def _fresh_producer():
+    producer = copy.copy(_PRODUCER_TEMPLATE)
+    producer.reset_mock(return_value=True, side_effect=True)
+    return producer
+
+
+class FakeConsumer:
+    """Confluent-shaped consumer stub: serves prepared message batches and
+    trips the client's stop event once drained, so _consume_thread exits
+    without exception-based control flow."""
+
+    def __init__(self, batches, stop_event):
+        self._batches = list(batches)
+        self._stop_event = stop_event
+        self.subscribed = None
+        self.committed = []
+
+    def subscribe(self, topics):
+        self.subscribed = topics
+
+    def consume(self, num_messages=1, timeout=None):
+        if self._batches:
+            return self._batches.pop(0)
+        self._stop_event.set()
+        return []
+
+    def commit(self, message=None, asynchronous=True):
+        self.committed.append(message)
+
+    def close(self):
+        pass
+
+
 class TestKafkaClient:
     
     @pytest.fixture
     def kafka_client(self):
         """Create a Kafka client for testing"""
         return KafkaClient(bootstrap_servers="localhost:9092")
+
+    @pytest.fixture
+    def no_thread(self, monkeypatch):
+        """Capture consumer-thread spawns without running them."""
+        spawned = []
+
+        class FakeThread:
+            def __init__(self, *args, **kwargs):
+                self.kwargs = kwargs
+                self.started = False
+                spawned.append(self)
+
+            def start(self):
+                self.started = True
+
+        monkeypatch.setattr("threading.Thread", FakeThread)
+        return spawned
     
-    @pytest.mark.asyncio
     async def test_start_success(self, kafka_client):
         """Test successful Kafka client startup"""
-        with patch('backend_orchestrator.src.messaging.kafka_client.KafkaProducer') as mock_producer_class:
-            mock_producer = Mock()
+        with patch('src.messaging.kafka_client.Producer') as mock_producer_class:
+            mock_producer = _fresh_producer()
             mock_producer_class.return_value = mock_producer
-            
+
             await kafka_client.start()
-            
-            assert kafka_client.producer == mock_producer
-            mock_producer_class.assert_called_once_with(
-                bootstrap_servers="localhost:9092",
-                value_serializer=kafka_client.producer.value_serializer if kafka_client.producer else None,
-                key_serializer=kafka_client.producer.key_serializer if kafka_client.producer else None
-            )
-    
-    @pytest.mark.asyncio
+            try:
+                assert kafka_client.producer is mock_producer
+
+                # One call_args read serves every assertion on the config.
+                args, kwargs = mock_producer_class.call_args
+                assert mock_producer_class.call_count == 1
+                config = args[0]
+                assert config["bootstrap.servers"] == "localhost:9092"
+                assert config["compression.type"] == "lz4"
+                assert config["acks"] == "1"
+            finally:
+                kafka_client._poll_task.cancel()
+
     async def test_start_failure(self, kafka_client):
         """Test Kafka client startup failure"""
-        with patch('backend_orchestrator.src.messaging.kafka_client.KafkaProducer', side_effect=Exception("Connection failed")):
+        with patch('src.messaging.kafka_client.Producer', side_effect=Exception("Connection failed")):
             with pytest.raises(Exception) as exc_info:
                 await kafka_client.start()
-            
+
             assert "Connection failed" in str(exc_info.value)
+            assert kafka_client.producer is None
     
-    @pytest.mark.asyncio
     async def test_stop(self, kafka_client):
         """Test Kafka client shutdown"""
-        mock_producer = Mock()
+        mock_producer = _fresh_producer()
         mock_consumer1 = Mock()
         mock_consumer2 = Mock()
-        
+
         kafka_client.producer = mock_producer
         kafka_client.consumers = {"topic1": mock_consumer1, "topic2": mock_consumer2}
-        
+
         await kafka_client.stop()
-        
-        mock_producer.close.assert_called_once()
+
+        mock_producer.flush.assert_called_once()
         mock_consumer1.close.assert_called_once()
         mock_consumer2.close.assert_called_once()
+        assert kafka_client.producer is None
+        assert kafka_client.consumers == {}
     
-    @pytest.mark.asyncio
     async def test_send_task_request_success(self, kafka_client):
         """Test successful task request sending"""
-        mock_producer = Mock()
-        mock_future = Mock()
-        mock_future.get.return_value = Mock()  # Mock record metadata
-        mock_producer.send.return_value = mock_future
-        
+        mock_producer = _fresh_producer()
         kafka_client.producer = mock_producer
         
         correlation_id = await kafka_client.send_task_request(
@@ -67,31 +131,28 @@ class TestKafkaClient:
             task_type="appointment_booking",
             payload={"user_id": "123", "message": "Book appointment"}
         )
-        
+
         assert correlation_id is not None
         assert len(correlation_id) == 36  # UUID length
-        
-        mock_producer.send.assert_called_once()
-        call_args = mock_producer.send.call_args
-        
-        assert call_args[0][0] == "test-agent-topic"  # topic
-        assert call_args[1]["key"] == correlation_id  # key
-        
-        message = call_args[1]["value"]
+
+        # Sends are enqueued for the producer loop, not produced inline.
+        topic, value, key, on_delivery = kafka_client._tx_queue.get_nowait()
+        assert kafka_client._tx_queue.empty()
+
+        assert topic == "test-agent-topic"
+        assert key == uuid.UUID(correlation_id).bytes
+        assert on_delivery is KafkaClient._log_delivery
+
+        message = orjson.loads(value)
         assert message["message_type"] == "TASK_REQUEST"
         assert message["correlation_id"] == correlation_id
         assert message["task_type"] == "appointment_booking"
         assert message["payload"]["user_id"] == "123"
         assert "timestamp" in message
     
-    @pytest.mark.asyncio
     async def test_send_task_request_with_correlation_id(self, kafka_client):
         """Test task request with provided correlation ID"""
-        mock_producer = Mock()
-        mock_future = Mock()
-        mock_future.get.return_value = Mock()
-        mock_producer.send.return_value = mock_future
-        
+        mock_producer = _fresh_producer()
         kafka_client.producer = mock_producer
         
         provided_correlation_id = "custom-correlation-id"
@@ -101,21 +162,17 @@ class TestKafkaClient:
             payload={"data": "test"},
             correlation_id=provided_correlation_id
         )
-        
+
         assert returned_correlation_id == provided_correlation_id
-        
-        call_args = mock_producer.send.call_args
-        message = call_args[1]["value"]
+
+        _, value, key, _ = kafka_client._tx_queue.get_nowait()
+        assert key == provided_correlation_id.encode("utf-8")
+        message = orjson.loads(value)
         assert message["correlation_id"] == provided_correlation_id
     
-    @pytest.mark.asyncio
     async def test_send_task_response(self, kafka_client):
         """Test sending task response"""
-        mock_producer = Mock()
-        mock_future = Mock()
-        mock_future.get.return_value = Mock()
-        mock_producer.send.return_value = mock_future
-        
+        mock_producer = _fresh_producer()
         kafka_client.producer = mock_producer
         
         await kafka_client.send_task_response(
@@ -124,84 +181,89 @@ class TestKafkaClient:
             status="SUCCESS",
             result={"appointment_id": "12345", "time": "2024-01-15 10:00"}
         )
-        
-        mock_producer.send.assert_called_once()
-        call_args = mock_producer.send.call_args
-        
-        assert call_args[0][0] == "response-topic"
-        assert call_args[1]["key"] == "test-correlation-id"
-        
-        message = call_args[1]["value"]
+
+        topic, value, key, _ = kafka_client._tx_queue.get_nowait()
+        assert kafka_client._tx_queue.empty()
+
+        assert topic == "response-topic"
+        assert key == b"test-correlation-id"
+
+        message = orjson.loads(value)
         assert message["message_type"] == "TASK_RESPONSE"
         assert message["correlation_id"] == "test-correlation-id"
         assert message["status"] == "SUCCESS"
         assert message["result"]["appointment_id"] == "12345"
         assert "timestamp" in message
     
-    def test_subscribe_to_responses(self, kafka_client):
+    def test_subscribe_to_responses(self, kafka_client, no_thread):
         """Test subscribing to response topic"""
         mock_handler = Mock()
-        
-        with patch('backend_orchestrator.src.messaging.kafka_client.KafkaConsumer') as mock_consumer_class:
+
+        with patch('src.messaging.kafka_client.Consumer') as mock_consumer_class:
             mock_consumer = Mock()
             mock_consumer_class.return_value = mock_consumer
-            
-            with patch('asyncio.create_task') as mock_create_task:
-                kafka_client.subscribe_to_responses("response-topic", mock_handler)
-                
-                assert "response-topic" in kafka_client.consumers
-                assert kafka_client.consumers["response-topic"] == mock_consumer
-                assert kafka_client.message_handlers["response-topic"] == mock_handler
-                
-                mock_consumer_class.assert_called_once_with(
-                    "response-topic",
-                    bootstrap_servers="localhost:9092",
-                    value_deserializer=kafka_client.consumers["response-topic"].value_deserializer if "response-topic" in kafka_client.consumers else None,
-                    key_deserializer=kafka_client.consumers["response-topic"].key_deserializer if "response-topic" in kafka_client.consumers else None,
-                    group_id='orchestrator-group'
-                )
-                
-                mock_create_task.assert_called_once()
+
+            kafka_client.subscribe_to_responses("response-topic", mock_handler)
+
+            assert kafka_client.consumers["response-topic"] is mock_consumer
+            assert kafka_client.message_handlers["response-topic"] is mock_handler
+
+            # One call_args read serves every assertion on the config.
+            args, kwargs = mock_consumer_class.call_args
+            assert mock_consumer_class.call_count == 1
+            config = args[0]
+            assert config["bootstrap.servers"] == "localhost:9092"
+            assert config["group.id"] == "orchestrator-group"
+            assert config["enable.auto.commit"] is False
+
+            # One dedicated consumer thread is spawned per subscription.
+            assert len(no_thread) == 1
+            assert no_thread[0].started
+            assert kafka_client.consumer_threads["response-topic"] is no_thread[0]
     
-    @pytest.mark.asyncio
     async def test_consume_messages(self, kafka_client):
-        """Test message consumption"""
-        mock_consumer = Mock()
-        mock_handler = AsyncMock()
-        
+        """Test message consumption through the dedicated consumer thread"""
+        received = asyncio.Queue()
+
+        async def handler(value):
+            await received.put(value)
+
         mock_message1 = Mock()
-        mock_message1.value = {"correlation_id": "123", "status": "SUCCESS"}
+        mock_message1.error.return_value = None
+        mock_message1.value.return_value = orjson.dumps({"correlation_id": "123", "status": "SUCCESS"})
         mock_message2 = Mock()
-        mock_message2.value = {"correlation_id": "456", "status": "ERROR"}
-        
-        mock_consumer.__iter__ = Mock(return_value=iter([mock_message1, mock_message2]))
-        
-        kafka_client.consumers["test-topic"] = mock_consumer
-        kafka_client.message_handlers["test-topic"] = mock_handler
-        
-        with patch.object(mock_consumer, '__iter__', return_value=iter([mock_message1, mock_message2])):
-            try:
-                await kafka_client._consume_messages("test-topic")
-            except StopIteration:
-                pass  # Expected when iterator is exhausted
-        
-        assert mock_handler.call_count == 2
-        mock_handler.assert_any_call({"correlation_id": "123", "status": "SUCCESS"})
-        mock_handler.assert_any_call({"correlation_id": "456", "status": "ERROR"})
+        mock_message2.error.return_value = None
+        mock_message2.value.return_value = orjson.dumps({"correlation_id": "456", "status": "ERROR"})
+
+        consumer = FakeConsumer([[mock_message1, mock_message2]], kafka_client._stop_event)
+        kafka_client._loop = asyncio.get_running_loop()
+        kafka_client.consumers["test-topic"] = consumer
+        kafka_client.message_handlers["test-topic"] = handler
+
+        thread = threading.Thread(target=kafka_client._consume_thread, args=("test-topic",))
+        thread.start()
+
+        first = await asyncio.wait_for(received.get(), timeout=1.0)
+        second = await asyncio.wait_for(received.get(), timeout=1.0)
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+        assert consumer.subscribed == ["test-topic"]
+        assert first == {"correlation_id": "123", "status": "SUCCESS"}
+        assert second == {"correlation_id": "456", "status": "ERROR"}
+        # Committing the newest processed message covers the whole batch.
+        assert consumer.committed[-1] is mock_message2
     
-    @pytest.mark.asyncio
     async def test_send_task_request_failure(self, kafka_client):
         """Test task request sending failure"""
-        mock_producer = Mock()
-        mock_producer.send.side_effect = Exception("Send failed")
-        
+        mock_producer = _fresh_producer()
         kafka_client.producer = mock_producer
-        
+        kafka_client._tx_queue.put_nowait = Mock(side_effect=Exception("Send failed"))
+
         with pytest.raises(Exception) as exc_info:
             await kafka_client.send_task_request(
                 agent_topic="test-topic",
                 task_type="test_task",
                 payload={"data": "test"}
             )
-        
+
         assert "Send failed" in str(exc_info.value)
@@ -87,6 +87,19 @@ def create_database_and_tables():
         cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
         print("'vector' extension is ready.")
 
+        # --- 5b. Create the 'vectorscale' extension (optional) ---
+        # pgvectorscale provides the DiskANN index, which keeps tail latency
+        # flat once the vector graph no longer fits shared_buffers.
+        vectorscale_available = False
+        try:
+            print("Creating 'vectorscale' extension if it doesn't exist...")
+            cur.execute("CREATE EXTENSION IF NOT EXISTS vectorscale CASCADE;")
+            vectorscale_available = True
+            print("'vectorscale' extension is ready.")
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"'vectorscale' extension not available ({e}). Falling back to IVFFlat index.")
+
         # --- 6. Define and create the 'documents' table ---
         print("Creating 'documents' table...")
         documents_table_sql = """
@@ -133,15 +146,27 @@ def create_database_and_tables():
         """)
         print("Index 'idx_document_id' created.")
 
-        # IVFFlat index for Approximate Nearest Neighbor (ANN) search
-        # Note: For a balance of build time, search speed, and recall, HNSW is often preferred.
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_embedding_ivfflat
-            ON document_chunks
-            USING ivfflat (embedding vector_cosine_ops)
-            WITH (lists = 100);
-        """)
-        print("Index 'idx_embedding_ivfflat' (IVFFlat) created.")
+        # ANN index for vector search. Prefer pgvectorscale's DiskANN, whose
+        # on-disk graph layout minimizes random page reads at multi-million
+        # chunk scale; fall back to IVFFlat when vectorscale is unavailable.
+        if vectorscale_available:
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_embedding_diskann
+                ON document_chunks
+                USING diskann (embedding vector_cosine_ops)
+                WITH (storage_layout = memory_optimized, num_neighbors = 50, search_list_size = 100);
+            """)
+            print("Index 'idx_embedding_diskann' (DiskANN) created.")
+            # Per-session tuning for queries: SET LOCAL diskann.query_search_list_size = 40;
+        else:
+            # Note: For a balance of build time, search speed, and recall, HNSW is often preferred.
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_embedding_ivfflat
+                ON document_chunks
+                USING ivfflat (embedding vector_cosine_ops)
+                WITH (lists = 100);
+            """)
+            print("Index 'idx_embedding_ivfflat' (IVFFlat) created.")
 
         # --- 9. Commit the changes ---
         conn.commit()